@@ -27,6 +27,12 @@ LINE_MAX_DEVIATION = 5.0        # Max deviation for <line> elements (bbox check)
 CURVE_STRAIGHT_MAX_DEVIATION = 2.0 # Max deviation for whole straight <curve> (range check)
 CURVE_SEGMENT_MAX_DEVIATION = 1.5 # Max deviation for segments within <curve>
 
+# --- Region of interest ---
+# "titleblock" preset: bottom-right zone of the drawing frame, as fractions of the frame size
+TITLEBLOCK_ROI_WIDTH = 0.4
+TITLEBLOCK_ROI_HEIGHT = 0.25
+ROI_PADDING = 2.0 # Grows the ROI so primitives on its border (e.g. the frame lines) are kept
+
 # Tolerance for clustering intersection points (if using DBSCAN or similar)
 #INTERSECTION_CLUSTER_EPS = 2.0 # Max distance between points for one to be considered as in the neighborhood of the other
 
@@ -1,17 +1,24 @@
 from pathlib import Path
 import logging
 
+from lxml import etree
+
 from layout_extraction.pdf_converter import PdfConverter
 from layout_extraction.line_extractor import LineExtractor
 from layout_extraction.visualizer import LineVisualizer
 from layout_extraction.intersection_finder import IntersectionFinder
+from layout_extraction.region_proposer import RegionProposer
 from layout_extraction.rectangle_detector import RectangleDetector
+from layout_extraction.template_cache import TemplateCache, _line_bbox, in_zone, contains, touches
 from layout_extraction.textbox_mapper import TextboxMapper
 from layout_extraction.rectangle_merger import (
+    parse_rectangles_xml,
     merge_rectangles_distinct,
+    attach_cell_grids,
     export_rectangles_to_xml,
 )
 from layout_extraction.stats_collector import StatsCollector
+from page_manifest import PageManifest, fingerprint_bytes
 from layout_extraction.reporter import (
     write_summary_csv,
     summary_dataframe,
@@ -22,21 +29,97 @@ log = logging.getLogger(__name__)
 
 
 class LayoutExtractionPipeline:
-    def __init__(self, debug_dir: Path | None = None):
+    def __init__(self, debug_dir: Path | None = None, roi=None, propose_regions: bool = False,
+                 template_cache_path: Path | None = None, incremental: bool = False, keep_glyphs: bool = False,
+                 pages=None):
+        """`roi` restricts extraction to a page region: an (x0, y0, x1, y1) bbox in PDF points or
+        "titleblock" for the bottom-right zone of the drawing frame. Primitives outside it are
+        dropped when the PDF is converted.
+
+        With `propose_regions`, only lines touching a proposed table region (see RegionProposer)
+        reach the intersection and rectangle stages.
+
+        With `template_cache_path`, title-block grids are reused across sheets that share a frame
+        (see TemplateCache).
+
+        With `incremental`, pages whose converted geometry and text match the last extraction
+        into the same output directory keep their rectangles XML instead of being re-extracted.
+
+        With `keep_glyphs`, the raw XML keeps pdfminer's per-glyph <text> elements instead of one
+        string per textline.
+
+        `pages` limits extraction to these 1-based page numbers; the other pages are neither
+        converted nor written, and their files from earlier runs are left alone.
+        """
         self.debug_dir = Path(debug_dir or "debug_output")
         self.debug_dir.mkdir(parents=True, exist_ok=True)
         log.info("Summary/debug files will be saved to %s", self.debug_dir.resolve())
 
-        self.converter = PdfConverter()
+        self.roi = roi
+        self.propose_regions = propose_regions
+        self.incremental = incremental
+        self.pages = pages
+        self.converter = PdfConverter(keep_glyphs=keep_glyphs)
         self.extractor = LineExtractor()
         self.visualizer = LineVisualizer()
         self.finder = IntersectionFinder()
+        self.proposer = RegionProposer() if propose_regions else None
+        self.templates = TemplateCache(template_cache_path) if template_cache_path else None
         self.stats = StatsCollector()
         self.images_dir = None
 
     def _debug_path(self, page_tag: str, label: str) -> Path:
         return self.images_dir / f"{page_tag}_{label}.png"
     
+    def _detect_all(self, horiz, vert):
+        intersections = self.finder.compute_intersections(horiz, vert)
+        detector = RectangleDetector(intersections)
+        return intersections, detector.detect(), detector.detect_cells()
+
+    def _detect(self, page_elem, horiz, vert):
+        """Intersections, rectangles, grid cells and revision table bounds (or None) of a page.
+
+        On a title-block template hit, only the lines that leave the title-block zone go through
+        intersection and rectangle detection; the zone's grid comes from the template.
+        """
+        if self.templates is None:
+            return self._detect_all(horiz, vert) + (None,)
+
+        zone, anchor = self.templates.locate(page_elem)
+        key = self.templates.fingerprint(horiz, vert, zone, anchor)
+        template = self.templates.lookup(key, horiz, vert, zone, anchor)
+        if template is None:
+            intersections, rects, cells = self._detect_all(horiz, vert)
+            self.templates.store(key, zone, anchor, intersections, rects, cells)
+            return intersections, rects, cells, None
+
+        known = self.templates.instantiate(template, anchor)
+        outside_h = [l for l in horiz if not contains(zone, _line_bbox(l))]
+        outside_v = [l for l in vert if not contains(zone, _line_bbox(l))]
+        points = [p for p in self.finder.compute_intersections(outside_h, outside_v) if not in_zone(p, zone)]
+        detector = RectangleDetector(points)
+        rects = detector.detect()
+        if any(touches(r["bbox"], zone) for r in rects):
+            # Geometry outside the template now reaches into the zone, so the template no longer
+            # describes the page; it is replaced if the page's own zone is self-contained
+            log.warning("Rectangles overlap the title-block zone; evicting template %s and detecting "
+                        "the page from scratch", key[:12])
+            self.templates.evict(key)
+            self.finder.reset()
+            intersections, rects, cells = self._detect_all(horiz, vert)
+            self.templates.store(key, zone, anchor, intersections, rects, cells)
+            return intersections, rects, cells, None
+
+        log.info("Reused title-block template %s (%d rectangles)", key[:12], len(known["rects"]))
+        return (points + known["points"], known["rects"] + rects, known["cells"] + detector.detect_cells(),
+                known["revision_table"])
+
+    @staticmethod
+    def _page_fingerprint(page_elem) -> str:
+        """Fingerprint of a page's primitives; pdfminer's <layout> text grouping isn't stable across runs."""
+        return fingerprint_bytes(b"".join(etree.tostring(el, with_tail=False)
+                                          for el in page_elem if el.tag != "layout"))
+
     def _extract_page_dimensions(self, page_elem) -> tuple[float, float]:
         bbox_str = page_elem.attrib.get("bbox", "0,0,1000,1000")
         _, _, x1, y1 = map(float, bbox_str.split(","))
@@ -51,10 +134,16 @@ class LayoutExtractionPipeline:
         self.images_dir.mkdir(parents=True, exist_ok=True)
 
         # Convert PDF and get list of page dicts
-        pages = self.converter.convert_and_parse(pdf_path)
+        pages = self.converter.convert_and_parse(pdf_path, self.roi, self.pages)
+        self.stats.add_fonts(**self.converter.font_stats)
         log.info("Loaded %d pages from '%s'", len(pages), pdf_path.name)
 
         all_tables = []
+        manifest = None
+        if self.incremental:
+            settings = {"roi": list(self.roi) if isinstance(self.roi, tuple) else self.roi,
+                        "propose_regions": self.propose_regions}
+            manifest = PageManifest(out_dir / "layout_manifest.json", settings)
 
         for page in pages:
             page_num = page["page_num"]
@@ -62,13 +151,43 @@ class LayoutExtractionPipeline:
             page_tag = f"p{page_num:04d}"
             self.stats.pages += 1
 
+            if manifest is not None:
+                rects_path = out_dir / f"{page_tag}_rectangles_merged.xml"
+                fingerprint = self._page_fingerprint(page["element"])
+                manifest.record(page_tag, fingerprint)
+                if manifest.unchanged(page_tag, fingerprint) and rects_path.exists():
+                    log.info("Page %d unchanged since the last extraction; keeping %s", page_num, rects_path.name)
+                    tables = parse_rectangles_xml(str(rects_path))
+                    for tbl in tables:
+                        self.stats.add_table(tbl["n_rows"], tbl["n_cols"])
+                    all_tables.extend(tables)
+                    self.stats.reused_pages += 1
+                    continue
+
+            # Extractor and finder accumulate state; start every page clean
+            self.extractor.reset()
+            self.finder.reset()
+
             horiz, vert = self.extractor.extract_lines(page["element"])
             self.stats.add_line_counts(len(horiz), len(vert))
 
-            intersections = self.finder.compute_intersections(horiz, vert)
-
-            detector = RectangleDetector(intersections)
-            rects_raw = detector.detect()
+            margin_lines = self.finder.find_margin_lines(horiz, vert, W, H)
+            if margin_lines is None:
+                log.warning("No margin line candidates on page %d", page_num)
+
+            # Drop drawing geometry (hatching, piping, dimensions) that can't form a table
+            grid_horiz, grid_vert = horiz, vert
+            if self.proposer is not None:
+                proposals = self.proposer.propose(horiz, vert, W, H)
+                grid_horiz = self.proposer.filter_lines(horiz, proposals)
+                grid_vert = self.proposer.filter_lines(vert, proposals)
+                self.stats.add_proposals(len(proposals), len(horiz) + len(vert) - len(grid_horiz) - len(grid_vert))
+                self.visualizer.draw_rectangles(
+                    [{"bbox": p} for p in proposals], W, H,
+                    self._debug_path(page_tag, "proposals")
+                )
+
+            intersections, rects_raw, cells, revision_table = self._detect(page["element"], grid_horiz, grid_vert)
             self.stats.add_rect_init(len(rects_raw))
 
             mapper = TextboxMapper(rects_raw, page["textboxes"])
@@ -77,6 +196,11 @@ class LayoutExtractionPipeline:
             rects = merge_rectangles_distinct(rects_mapped)
             self.stats.add_rect_merged(len(rects))
 
+            # Keep the detector's cell grid so the semantic stage doesn't rebuild it
+            attach_cell_grids(rects, cells)
+            export_rectangles_to_xml(rects, out_dir / f"{page_tag}_rectangles_merged.xml", margin_lines,
+                                     revision_table)
+
             tables = rects
             for tbl in tables:
                 self.stats.add_table(tbl.get("n_rows", 0), tbl.get("n_cols", 0))
@@ -87,6 +211,8 @@ class LayoutExtractionPipeline:
                 horiz, vert, W, H,
                 self._debug_path(page_tag, "lines"),
                 intersections=None,
+                filtered_horiz=grid_horiz if self.proposer is not None else None,
+                filtered_vert=grid_vert if self.proposer is not None else None,
             )
             self.visualizer.draw_intersections(
                 intersections, W, H,
@@ -102,6 +228,12 @@ class LayoutExtractionPipeline:
             #     self._debug_path(page_tag, "tables")
             # )
 
+        if manifest is not None:
+            manifest.save(keep_previous=self.pages is not None)
+        if self.templates is not None:
+            self.templates.save()
+            self.stats.template_cache = self.templates.stats()
+
         # Write summary + XML output
         summary = self.stats.as_summary()
         write_summary_csv(summary, self.debug_dir / "summary.csv")
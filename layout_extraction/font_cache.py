@@ -0,0 +1,162 @@
+# font_cache.py
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+from pdfminer.pdfinterp import PDFResourceManager
+from pdfminer.pdftypes import PDFObjRef, PDFStream
+from pdfminer.psparser import PSLiteral, PSKeyword
+
+logger = logging.getLogger(__name__)
+
+MAX_DIGEST_DEPTH = 12   # Guards against deep or cyclic Type3 resource graphs
+
+
+def _feed(h, obj, depth: int, seen: set) -> None:
+    """Feeds a canonical serialization of a PDF object graph into hash `h`."""
+    if isinstance(obj, PDFObjRef):
+        obj = obj.resolve()
+        if depth >= MAX_DIGEST_DEPTH or id(obj) in seen:
+            h.update(b"R")
+            return
+        seen = seen | {id(obj)}
+
+    if isinstance(obj, dict):
+        h.update(b"{")
+        for key in sorted(obj, key=str):
+            h.update(str(key).encode() + b":")
+            _feed(h, obj[key], depth + 1, seen)
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for item in obj:
+            _feed(h, item, depth + 1, seen)
+        h.update(b"]")
+    elif isinstance(obj, PDFStream):
+        _feed(h, obj.attrs, depth + 1, seen)
+        # Decoded data: pdfminer drops the raw bytes once a stream is decoded
+        h.update(b"S" + hashlib.sha1(obj.get_data() or b"").digest())
+    elif isinstance(obj, (PSLiteral, PSKeyword)):
+        h.update(b"/" + str(obj.name).encode())
+    elif isinstance(obj, bytes):
+        h.update(b"b" + obj)
+    else:
+        h.update(repr(obj).encode())
+
+
+def font_digest(spec) -> str:
+    """Content digest of a font dictionary, including its descriptor and embedded font program."""
+    h = hashlib.sha1()
+    _feed(h, spec, 0, set())
+    return h.hexdigest()
+
+
+def _detach(obj, memo: dict):
+    """Copy of a PDF value with references resolved and streams decoded, so it no longer holds
+    on to its PDFDocument (every PDFObjRef keeps the document alive)."""
+    if isinstance(obj, PDFObjRef):
+        return _detach(obj.resolve(), memo)
+    if isinstance(obj, tuple):
+        return tuple(_detach(item, memo) for item in obj)
+    if not isinstance(obj, (dict, list, PDFStream)):
+        return obj
+    if id(obj) in memo:
+        return memo[id(obj)]
+
+    # Registered before recursing, so cyclic Type3 resources end up as cyclic copies
+    if isinstance(obj, dict):
+        copy = memo[id(obj)] = {}
+        copy.update((key, _detach(value, memo)) for key, value in obj.items())
+    elif isinstance(obj, list):
+        copy = memo[id(obj)] = []
+        copy.extend(_detach(item, memo) for item in obj)
+    else:
+        copy = memo[id(obj)] = PDFStream({}, b"")
+        copy.data, copy.rawdata = obj.get_data(), None
+        copy.attrs.update((key, _detach(value, memo)) for key, value in obj.attrs.items())
+    return copy
+
+
+def detach_font(font):
+    """Strips a parsed font of references into its source document before it is cached."""
+    memo = {}
+    for name, value in vars(font).items():
+        setattr(font, name, _detach(value, memo))
+    return font
+
+
+class CachingResourceManager(PDFResourceManager):
+    """PDFResourceManager whose font cache outlives a single document.
+
+    pdfminer caches fonts by object id, which is only unique within one PDF. Here fonts are
+    cached by a digest of their content, so the CAD fonts a drawing set shares are parsed
+    once per process instead of once per document. CMaps are already cached process-wide by
+    pdfminer's CMapDB.
+
+    Cached fonts are detached from their document (see detach_font), so the cache doesn't keep
+    parsed PDFs alive. The digest is only taken the first time a font object appears in a
+    document; later pages find it by object id. Call begin_document() and end_document() around
+    each document to drop those entries.
+
+    `reused` counts fonts found in the cache from an earlier document, `document_hits` repeated
+    lookups of a font within one document.
+    """
+
+    def __init__(self, max_fonts: int = 256):
+        super().__init__(caching=True)
+        self.max_fonts = max_fonts
+        self.fonts: "OrderedDict[str, object]" = OrderedDict()
+        self._document_fonts = {}  # objid -> (spec, font) for the current document
+        self.parsed = self.reused = self.document_hits = 0
+        self.seconds = 0.0
+
+    def get_font(self, objid, spec):
+        # Descendant fonts of a Type0 font arrive without an objid and are part of their parent
+        if not objid:
+            return super().get_font(objid, spec)
+
+        # The spec is the document's cached object, so identity rules out an objid of another PDF
+        known = self._document_fonts.get(objid)
+        if known is not None and known[0] is spec:
+            self.document_hits += 1
+            return known[1]
+
+        start = time.perf_counter()
+        key = font_digest(spec)
+        font = self.fonts.get(key)
+        if font is not None:
+            self.fonts.move_to_end(key)
+            self.reused += 1
+        else:
+            font = detach_font(super().get_font(None, spec))
+            self.fonts[key] = font
+            while len(self.fonts) > self.max_fonts:
+                self.fonts.popitem(last=False)
+            self.parsed += 1
+        self._document_fonts[objid] = (spec, font)
+        self.seconds += time.perf_counter() - start
+        return font
+
+    def begin_document(self):
+        self._document_fonts = {}
+
+    def end_document(self):
+        # The entries hold the document's own font dictionaries
+        self._document_fonts = {}
+
+    def stats(self) -> dict:
+        return {"parsed": self.parsed, "reused": self.reused, "document_hits": self.document_hits,
+                "seconds": self.seconds}
+
+
+_shared = None
+
+
+def shared_resource_manager() -> CachingResourceManager:
+    """The process-wide resource manager, so every converter in a worker shares its font cache."""
+    global _shared
+    if _shared is None:
+        _shared = CachingResourceManager()
+    return _shared
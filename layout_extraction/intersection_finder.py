@@ -1,4 +1,5 @@
 import logging
+import numpy as np
 from shapely.geometry import LineString
 
 logger = logging.getLogger(__name__)
@@ -44,6 +45,44 @@ class IntersectionFinder:
         self.filtered_lines[orientation] = filtered
         return filtered + margin
 
+    def find_margin_lines(self, horizontal_lines, vertical_lines, page_width, page_height, k=2):
+        """Picks the frame lines of the page: the k longest straight lines per orientation.
+
+        Returns the bboxes of the longest horizontal and vertical line, or None if either
+        orientation has no candidate.
+        """
+        MAX_FRACTION = 0.95
+
+        self.margin_lines["horizontal"] = self._longest_lines(horizontal_lines, 0, MAX_FRACTION * page_width, k)
+        self.margin_lines["vertical"] = self._longest_lines(vertical_lines, 1, MAX_FRACTION * page_height, k)
+
+        for orientation, lines in self.margin_lines.items():
+            for line in lines:
+                logger.info(f"Margin candidate ({orientation}): {line['bbox']} — length {line['length']:.1f}")
+
+        if not self.margin_lines["horizontal"] or not self.margin_lines["vertical"]:
+            return None
+        return self.margin_lines["horizontal"][0]["bbox"], self.margin_lines["vertical"][0]["bbox"]
+
+    @staticmethod
+    def _longest_lines(lines, axis, max_length, k):
+        EPSILON = 2
+        MIN_LENGTH = 10
+
+        if not lines:
+            return []
+        boxes = np.array([[float(v) for v in l["bbox"].split(",")] for l in lines])
+        length = np.abs(boxes[:, axis + 2] - boxes[:, axis])
+        thickness = np.abs(boxes[:, 3 - axis] - boxes[:, 1 - axis])
+        idx = np.flatnonzero((thickness < EPSILON) & (length >= MIN_LENGTH) & (length <= max_length))
+
+        # Top-k without a full sort; ties at the cut keep their original order
+        if len(idx) > k:
+            kth = length[idx[np.argpartition(-length[idx], k - 1)[:k]]].min()
+            idx = idx[length[idx] >= kth]
+        top = sorted(idx, key=lambda i: (-length[i], i))[:k]
+        return [{"bbox": boxes[i].tolist(), "length": float(length[i])} for i in top]
+
     def compute_intersections(self, horizontal_lines, vertical_lines):
         logger.info("Finding intersections between horizontal and vertical lines...")
 
@@ -84,4 +123,9 @@ class IntersectionFinder:
         return list(self.intersections)
 
     def export_as_points(self):
-        return [{"x": x, "y": y} for x, y in sorted(self.intersections)]
\ No newline at end of file
+        return [{"x": x, "y": y} for x, y in sorted(self.intersections)]
+
+    def reset(self):
+        self.intersections = set()
+        self.margin_lines = {"horizontal": [], "vertical": []}
+        self.filtered_lines = {"horizontal": [], "vertical": []}
\ No newline at end of file
@@ -1,23 +1,39 @@
 import os
 from io import BytesIO
 from pathlib import Path
-from pdfminer.high_level import extract_text_to_fp
+from pdfminer.converter import XMLConverter
 from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
 try:
     from lxml import etree as ET
 except ImportError:
     print("Warning: lxml not found. Falling back to xml.etree.ElementTree.")
     import xml.etree.ElementTree as ET
 from .config import PDFMINER_COMMAND
+from .font_cache import shared_resource_manager
+from .roi import resolve_roi, prune_page
+from .utils import bbox_to_str, textline_text
 import logging
 
 class PdfConverter:
-    def __init__(self, output_folder: str = "data/output"):
+    def __init__(self, output_folder: str = "data/output", keep_glyphs: bool = False, resources=None):
+        """Unless `keep_glyphs` is set, pdfminer's per-glyph <text> elements are collapsed into
+        the text of their <textline>, which keeps its bbox.
+
+        `resources` defaults to the process-wide CachingResourceManager, so fonts parsed for one
+        document are reused for the next. `font_stats` holds its counters for the last conversion.
+        """
         self.output_folder = output_folder
+        self.keep_glyphs = keep_glyphs
+        self.resources = resources or shared_resource_manager()
+        self.font_stats = {"parsed": 0, "reused": 0, "document_hits": 0, "seconds": 0.0}
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
 
-    def convert(self, pdf_path: str, output_xml_path: str):
+    def convert(self, pdf_path: str, output_xml_path: str, roi=None, pages=None):
+        """Converts the PDF, or only the 1-based `pages` of it; page ids keep the document's numbering."""
+        self.font_stats = {"parsed": 0, "reused": 0, "document_hits": 0, "seconds": 0.0}
         if not os.path.exists(pdf_path):
             self.logger.error(f"❌ Input PDF not found: {pdf_path}")
             return None
@@ -32,9 +48,38 @@ class PdfConverter:
                 boxes_flow=0.5
             )
 
+            before = self.resources.stats()
+            self.resources.begin_document()
             xml_output = BytesIO()
-            with open(pdf_path, "rb") as pdf_file:
-                extract_text_to_fp(pdf_file, xml_output, output_type="xml", laparams=laparams)
+            device = XMLConverter(self.resources, xml_output, laparams=laparams)
+            try:
+                interpreter = PDFPageInterpreter(self.resources, device)
+                page_numbers = sorted(pages) if pages else None
+                with open(pdf_path, "rb") as pdf_file:
+                    if page_numbers is None:
+                        selected = enumerate(PDFPage.get_pages(pdf_file, caching=True), 1)
+                    else:
+                        # pdfminer skips unselected pages without interpreting them and stops after the last
+                        selected = zip(page_numbers, PDFPage.get_pages(pdf_file, {n - 1 for n in page_numbers},
+                                                                        maxpages=page_numbers[-1], caching=True))
+                    converted = 0
+                    for page_number, page in selected:
+                        device.pageno = page_number  # <page id> keeps the document's numbering
+                        interpreter.process_page(page)
+                        converted += 1
+            finally:
+                device.close()
+                self.resources.end_document()
+
+            if page_numbers is not None and converted < len(page_numbers):
+                missing = ", ".join(map(str, page_numbers[converted:]))
+                self.logger.warning(f"⚠️ {pdf_path} has no page {missing}")
+
+            after = self.resources.stats()
+            self.font_stats = {key: after[key] - before[key] for key in after}
+            self.logger.info(f"Fonts: {self.font_stats['parsed']} parsed, {self.font_stats['reused']} reused "
+                             f"from earlier documents, {self.font_stats['document_hits']} repeated within "
+                             f"this one, {self.font_stats['seconds']:.3f}s")
 
             xml_output.seek(0)
             xml_content = xml_output.read()
@@ -44,6 +89,19 @@ class PdfConverter:
 
             root = ET.fromstring(xml_content) if ET.__name__ == "lxml.etree" else ET.fromstring(xml_content.decode('utf-8'))
 
+            # Discard primitives outside the region of interest before any geometry work
+            if roi is not None:
+                for page_el in root.findall(".//page"):
+                    roi_bbox = resolve_roi(roi, page_el)
+                    removed = prune_page(page_el, roi_bbox)
+                    page_el.set("roi", bbox_to_str(roi_bbox))
+                    self.logger.info(f"ROI {bbox_to_str(roi_bbox)} on page {page_el.get('id')}: "
+                                     f"discarded {removed} primitives, kept {len(page_el)}")
+
+            if not self.keep_glyphs:
+                collapsed = self.collapse_glyphs(root)
+                self.logger.info(f"Collapsed {collapsed} glyphs into textline strings.")
+
             # Patch zero-width lines
             self.logger.info("Patching zero-width lines...")
             all_lines = root.xpath(".//line[@linewidth]") if ET.__name__ == "lxml.etree" else [
@@ -73,11 +131,26 @@ class PdfConverter:
             self.logger.error(f"❌ Error converting {pdf_path}: {e}", exc_info=True)
             return None
 
-    def convert_and_parse(self, pdf_path: str) -> list:
+    @staticmethod
+    def collapse_glyphs(root) -> int:
+        """Replaces the <text> children of every <textline> by their joined string; returns how many were removed."""
+        removed = 0
+        for textline in root.iter("textline"):
+            glyphs = textline.findall("text")
+            if not glyphs:
+                continue
+            text = textline_text(textline)
+            for glyph in glyphs:
+                textline.remove(glyph)
+            textline.text = text
+            removed += len(glyphs)
+        return removed
+
+    def convert_and_parse(self, pdf_path: str, roi=None, pages=None) -> list:
         stem = Path(pdf_path).stem
         output_xml_path = os.path.join(self.output_folder, f"{stem}_raw_output.xml")
 
-        result = self.convert(pdf_path, output_xml_path)
+        result = self.convert(pdf_path, output_xml_path, roi, pages)
         if result is None:
             return []
 
@@ -1,4 +1,6 @@
 import logging
+from bisect import bisect_right
+from collections import defaultdict
 from typing import List, Dict, Tuple, Optional
 from shapely.geometry import box
 from .utils import bbox_area
@@ -40,6 +42,7 @@ class RectangleDetector:
         self.min_width = min_width
         self.min_height = min_height
         self.rectangles: List[Dict] = []
+        self.cells: List[Dict] = []
 
         # Fast lookup for corner matching
         self.point_index = {
@@ -102,6 +105,30 @@ class RectangleDetector:
         self.rectangles = rectangles
         return rectangles
 
+    def detect_cells(self) -> List[Dict]:
+        """Minimal grid cells: each point spans to its nearest neighbour to the right on the
+        same y and to its nearest neighbour above on the same x."""
+        xs_by_row = defaultdict(list)
+        ys_by_col = defaultdict(list)
+        for x, y in self.intersections:
+            xs_by_row[y].append(x)
+            ys_by_col[x].append(y)
+        for xs in xs_by_row.values():
+            xs.sort()
+        for ys in ys_by_col.values():
+            ys.sort()
+
+        cells = []
+        for x0, y0 in self.intersections:
+            row, col = xs_by_row[y0], ys_by_col[x0]
+            i, j = bisect_right(row, x0), bisect_right(col, y0)
+            if i < len(row) and j < len(col):
+                cells.append({"bbox": (x0, y0, row[i], col[j])})
+
+        logger.info(f"Detected {len(cells)} grid cells.")
+        self.cells = cells
+        return cells
+
     def remove_large_containers(self, rectangles: List[Dict]) -> List[Dict]:
         """Removes rectangles that are fully contained inside larger ones."""
         filtered = []
@@ -28,9 +28,19 @@ def parse_rectangles_xml(xml_path: str) -> List[Dict[str, Any]]:
                 continue
             ttext = text.text.strip() if text.text else ""
             texts.append(TextBox(bbox=tbbox, text=ttext, page_number=-1))
+
+        cells = []
+        for cell in rect.findall("cell"):
+            entry = {"bbox": parse_bbox(cell.attrib.get("bbox"))}
+            for key in ("row", "col", "rowspan", "colspan"):
+                entry[key] = int(cell.attrib.get(key, 0))
+            cells.append(entry)
         rectangles.append({
             "bbox": bbox,
-            "texts": texts
+            "texts": texts,
+            "cells": cells,
+            "n_rows": max((c["row"] + c["rowspan"] for c in cells), default=0),
+            "n_cols": max((c["col"] + c["colspan"] for c in cells), default=0),
         })
     return rectangles
 
@@ -132,11 +142,60 @@ def merge_rectangles_distinct(rectangles: List[Dict[str, Any]], page_height: Opt
 
     return filtered
 
-def export_rectangles_to_xml(rectangles: List[Dict[str, Any]], output_path: str):
+def attach_cell_grids(merged: List[Dict[str, Any]], cells: List[Dict[str, Any]], tol: float = 1e-3) -> None:
+    """Attaches the detector's grid cells to each merged rectangle as a row/column grid.
+
+    Rows are numbered top-down (descending y), columns left-to-right; spans count the grid
+    lines a cell crosses. Grid lines are the cells' edges rounded to 0.1 pt.
+    """
+    for rect in merged:
+        x0, y0, x1, y1 = rect["bbox"]
+        outer = (x0 - tol, y0 - tol, x1 + tol, y1 + tol)
+        inside = [c["bbox"] for c in cells if bbox_is_contained(c["bbox"], outer)]
+        if not inside:
+            rect["cells"] = []
+            rect["n_rows"] = rect["n_cols"] = 0
+            continue
+
+        xs = sorted({round(v, 1) for b in inside for v in (b[0], b[2])})
+        ys = sorted({round(v, 1) for b in inside for v in (b[1], b[3])}, reverse=True)
+        x_index = {v: i for i, v in enumerate(xs)}
+        y_index = {v: i for i, v in enumerate(ys)}
+
+        grid = []
+        for b in inside:
+            row = y_index[round(b[3], 1)]
+            col = x_index[round(b[0], 1)]
+            grid.append({
+                "bbox": b,
+                "row": row,
+                "col": col,
+                "rowspan": y_index[round(b[1], 1)] - row,
+                "colspan": x_index[round(b[2], 1)] - col,
+            })
+        grid.sort(key=lambda c: (c["row"], c["col"]))
+        rect["cells"] = grid
+        rect["n_rows"] = len(ys) - 1
+        rect["n_cols"] = len(xs) - 1
+
+def export_rectangles_to_xml(rectangles: List[Dict[str, Any]], output_path: str,
+                             margin_lines: Optional[tuple] = None, revision_table: Optional[tuple] = None):
     root = etree.Element("rectangles")
+    if margin_lines is not None:
+        # Page frame lines, read by the semantic stage to locate the title block
+        root.set("margin_bottom", bbox_to_str(margin_lines[0]))
+        root.set("margin_right", bbox_to_str(margin_lines[1]))
+    if revision_table is not None:
+        # Revision table bounds known from a title-block template
+        root.set("revision_table", bbox_to_str(revision_table))
     for rect in rectangles:
         rect_elem = etree.SubElement(root, "rectangle")
         rect_elem.set("bbox", bbox_to_str(rect["bbox"]))
+        for cell in rect.get("cells", []):
+            cell_elem = etree.SubElement(rect_elem, "cell")
+            cell_elem.set("bbox", bbox_to_str(cell["bbox"]))
+            for key in ("row", "col", "rowspan", "colspan"):
+                cell_elem.set(key, str(cell[key]))
         for tb in rect["texts"]:
             text_elem = etree.SubElement(rect_elem, "text")
             text_elem.set("bbox", bbox_to_str(tb.bbox))
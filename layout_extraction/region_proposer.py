@@ -0,0 +1,180 @@
+# region_proposer.py
+
+import logging
+import math
+from collections import deque
+from typing import List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BoundingBox = Tuple[float, float, float, float]
+
+
+class RegionProposer:
+    def __init__(
+        self,
+        cell_size: float = 25.0,
+        min_length: float = 10.0,
+        min_crossings: int = 4,
+        tolerance: float = 1.5,
+        max_rule_fraction: float = 0.5,
+    ):
+        """
+        Cheap table/title-block region proposals from line-coverage histograms.
+
+        The page is rasterized into square cells. Every horizontal and vertical rule of at
+        least `min_length` adds coverage to the cells it runs through. Cells near both kinds of
+        rules form candidate regions. Regions sharing a rule are merged, since wide columns
+        leave gaps in the histogram; rules longer than `max_rule_fraction` of the page (frame
+        lines) don't merge regions. A merged region is proposed only if at least
+        `min_crossings` of its rules cross each other, as a grid of cells needs.
+
+        Args:
+            cell_size: Histogram cell size in PDF points.
+            min_length: Shorter rules are ignored.
+            min_crossings: Minimum horizontal/vertical crossings inside a proposal.
+            tolerance: Slack when testing whether two rules cross.
+            max_rule_fraction: Longest rule, relative to the page, that merges regions.
+        """
+        self.cell_size = cell_size
+        self.min_length = min_length
+        self.min_crossings = min_crossings
+        self.tolerance = tolerance
+        self.max_rule_fraction = max_rule_fraction
+
+    @staticmethod
+    def _boxes(lines) -> np.ndarray:
+        boxes = [[float(v) for v in l["bbox"].split(",")] if isinstance(l["bbox"], str) else list(l["bbox"])
+                 for l in lines]
+        return np.array(boxes, dtype=float).reshape(-1, 4)
+
+    def _coverage(self, boxes: np.ndarray, axis: int, shape: Tuple[int, int]) -> np.ndarray:
+        """(rows, cols) count of rules along `axis` (0 = horizontal, 1 = vertical) per cell."""
+        grid = np.zeros((shape[0], shape[1] + 1) if axis == 0 else (shape[0] + 1, shape[1]))
+        if len(boxes) == 0:
+            return grid[:shape[0], :shape[1]]
+
+        cs = self.cell_size
+        along0 = np.floor(boxes[:, axis] / cs).astype(int)
+        along1 = np.floor(boxes[:, axis + 2] / cs).astype(int)
+        across = np.floor((boxes[:, 1 - axis] + boxes[:, 3 - axis]) / 2 / cs).astype(int)
+        limit = shape[1] - 1 if axis == 0 else shape[0] - 1
+        along0, along1 = np.clip(along0, 0, limit), np.clip(along1, 0, limit)
+        across = np.clip(across, 0, (shape[0] if axis == 0 else shape[1]) - 1)
+
+        # Difference array along the rule's direction, summed up once
+        if axis == 0:
+            np.add.at(grid, (across, along0), 1)
+            np.add.at(grid, (across, along1 + 1), -1)
+            return np.cumsum(grid, axis=1)[:, :shape[1]]
+        np.add.at(grid, (along0, across), 1)
+        np.add.at(grid, (along1 + 1, across), -1)
+        return np.cumsum(grid, axis=0)[:shape[0], :]
+
+    @staticmethod
+    def _dilate(mask: np.ndarray) -> np.ndarray:
+        """3x3 binary dilation."""
+        padded = np.pad(mask, 1)
+        out = np.zeros_like(mask)
+        rows, cols = mask.shape
+        for dy in range(3):
+            for dx in range(3):
+                out |= padded[dy:dy + rows, dx:dx + cols]
+        return out
+
+    @staticmethod
+    def _components(mask: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """(row0, col0, row1, col1) extents of the 8-connected components of `mask`."""
+        seen = np.zeros_like(mask)
+        rows, cols = mask.shape
+        extents = []
+        for start in zip(*np.nonzero(mask)):
+            if seen[start]:
+                continue
+            seen[start] = True
+            r0 = r1 = start[0]
+            c0 = c1 = start[1]
+            queue = deque([start])
+            while queue:
+                r, c = queue.popleft()
+                r0, r1, c0, c1 = min(r0, r), max(r1, r), min(c0, c), max(c1, c)
+                for nr in range(max(r - 1, 0), min(r + 2, rows)):
+                    for nc in range(max(c - 1, 0), min(c + 2, cols)):
+                        if mask[nr, nc] and not seen[nr, nc]:
+                            seen[nr, nc] = True
+                            queue.append((nr, nc))
+            extents.append((r0, c0, r1, c1))
+        return extents
+
+    def _crossings(self, h: np.ndarray, v: np.ndarray, region: BoundingBox) -> int:
+        """Horizontal/vertical rule pairs crossing inside `region`."""
+        x0, y0, x1, y1 = region
+        h = h[(h[:, 1] >= y0) & (h[:, 1] <= y1) & (h[:, 0] <= x1) & (h[:, 2] >= x0)]
+        v = v[(v[:, 0] >= x0) & (v[:, 0] <= x1) & (v[:, 1] <= y1) & (v[:, 3] >= y0)]
+        if len(h) == 0 or len(v) == 0:
+            return 0
+        t = self.tolerance
+        vx, hy = v[:, 0][None, :], h[:, 1][:, None]
+        cross = ((h[:, 0][:, None] - t <= vx) & (vx <= h[:, 2][:, None] + t)
+                 & (v[:, 1][None, :] - t <= hy) & (hy <= v[:, 3][None, :] + t))
+        return int(cross.sum())
+
+    def propose(self, horizontal_lines, vertical_lines, page_width, page_height) -> List[BoundingBox]:
+        """Candidate table/title-block regions of a page, in page coordinates."""
+        h = self._boxes(horizontal_lines)
+        v = self._boxes(vertical_lines)
+        h = h[np.abs(h[:, 2] - h[:, 0]) >= self.min_length]
+        v = v[np.abs(v[:, 3] - v[:, 1]) >= self.min_length]
+        h[:, [0, 2]] = np.sort(h[:, [0, 2]], axis=1)
+        v[:, [1, 3]] = np.sort(v[:, [1, 3]], axis=1)
+
+        cs = self.cell_size
+        shape = (math.ceil(page_height / cs) + 1, math.ceil(page_width / cs) + 1)
+        h_mask = self._dilate(self._coverage(h, 0, shape) > 0)
+        v_mask = self._dilate(self._coverage(v, 1, shape) > 0)
+
+        regions = [(c0 * cs, r0 * cs, (c1 + 1) * cs, (r1 + 1) * cs)
+                   for r0, c0, r1, c1 in self._components(h_mask & v_mask)]
+
+        # Wide columns split a table into one component per vertical rule, each with too few
+        # crossings on its own, so components are merged before they are checked
+        short_h = h[h[:, 2] - h[:, 0] <= self.max_rule_fraction * page_width]
+        short_v = v[v[:, 3] - v[:, 1] <= self.max_rule_fraction * page_height]
+        merged = self._merge(regions, np.concatenate((short_h, short_v)))
+        proposals = [region for region in merged if self._crossings(h, v, region) >= self.min_crossings]
+        for region in proposals:
+            logger.info(f"Region proposal {region} — {self._crossings(h, v, region)} crossings")
+        logger.info(f"Proposed {len(proposals)} table regions")
+        return proposals
+
+    @staticmethod
+    def _merge(regions: List[BoundingBox], rules: np.ndarray) -> List[BoundingBox]:
+        """Unions regions touched by a common rule until no rule joins two of them."""
+        while len(regions) > 1:
+            boxes = np.array(regions)
+            touches = ((rules[:, 0][:, None] <= boxes[:, 2]) & (boxes[:, 0] <= rules[:, 2][:, None])
+                       & (rules[:, 1][:, None] <= boxes[:, 3]) & (boxes[:, 1] <= rules[:, 3][:, None]))
+            joining = touches[touches.sum(axis=1) > 1]
+            if len(joining) == 0:
+                break
+            # Every region the first such rule touches becomes one
+            members = set(np.flatnonzero(joining[0]).tolist())
+            merged = (min(regions[i][0] for i in members), min(regions[i][1] for i in members),
+                      max(regions[i][2] for i in members), max(regions[i][3] for i in members))
+            regions = [r for i, r in enumerate(regions) if i not in members] + [merged]
+        return [tuple(float(v) for v in r) for r in regions]
+
+    @staticmethod
+    def filter_lines(lines, proposals: List[BoundingBox]):
+        """Lines touching at least one proposal, kept whole."""
+        kept = []
+        for line in lines:
+            bbox = line["bbox"]
+            x0, y0, x1, y1 = map(float, bbox.split(",")) if isinstance(bbox, str) else bbox
+            x0, x1 = min(x0, x1), max(x0, x1)
+            y0, y1 = min(y0, y1), max(y0, y1)
+            if any(x0 <= px1 and px0 <= x1 and y0 <= py1 and py0 <= y1 for px0, py0, px1, py1 in proposals):
+                kept.append(line)
+        return kept
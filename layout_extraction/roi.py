@@ -0,0 +1,96 @@
+# roi.py
+
+import logging
+from typing import Union
+from .config import TITLEBLOCK_ROI_WIDTH, TITLEBLOCK_ROI_HEIGHT, ROI_PADDING, LINE_MAX_DEVIATION
+from .utils import BBox, parse_bbox, bbox_intersects
+
+logger = logging.getLogger(__name__)
+
+TITLEBLOCK = "titleblock"
+
+# Page-level pdfminer elements that are kept or discarded as a whole
+PRUNABLE_TAGS = {"textbox", "line", "rect", "curve", "image"}
+# Primitives nested in a <figure>, whose glyphs are loose <text> elements
+FIGURE_TAGS = {"text", "line", "rect", "curve", "image"}
+
+
+def parse_roi(spec: str) -> Union[str, BBox]:
+    """ROI from a command-line value: the "titleblock" preset or "x0,y0,x1,y1" in PDF points."""
+    if spec.strip().lower() == TITLEBLOCK:
+        return TITLEBLOCK
+    try:
+        x0, y0, x1, y1 = parse_bbox(spec)
+    except ValueError:
+        raise ValueError(f"ROI must be '{TITLEBLOCK}' or x0,y0,x1,y1, got {spec!r}")
+    if x1 <= x0 or y1 <= y0:
+        raise ValueError(f"ROI {spec!r} is empty")
+    return x0, y0, x1, y1
+
+
+def frame_bbox(page_el) -> BBox:
+    """Drawing frame of a page, spanned by its longest horizontal and vertical line primitives.
+
+    Only bbox attributes are read, so this is cheap enough to run before any line extraction.
+    Falls back to the page bbox if the page has no straight lines.
+    """
+    longest_h = longest_v = None
+    h_length = v_length = 0.0
+    for el in page_el.iter("line", "curve"):
+        bbox_str = el.get("bbox")
+        if not bbox_str:
+            continue
+        x0, y0, x1, y1 = parse_bbox(bbox_str)
+        if y1 - y0 < LINE_MAX_DEVIATION and x1 - x0 > h_length:
+            longest_h, h_length = (x0, y0, x1, y1), x1 - x0
+        elif x1 - x0 < LINE_MAX_DEVIATION and y1 - y0 > v_length:
+            longest_v, v_length = (x0, y0, x1, y1), y1 - y0
+
+    if longest_h is None or longest_v is None:
+        return parse_bbox(page_el.get("bbox", "0,0,1000,1000"))
+    return longest_h[0], longest_v[1], longest_h[2], longest_v[3]
+
+
+def titleblock_zone(frame: BBox) -> BBox:
+    """Bottom-right zone of a drawing frame where the title block sits, padded."""
+    fx0, fy0, fx1, fy1 = frame
+    return (fx1 - TITLEBLOCK_ROI_WIDTH * (fx1 - fx0) - ROI_PADDING, fy0 - ROI_PADDING,
+            fx1 + ROI_PADDING, fy0 + TITLEBLOCK_ROI_HEIGHT * (fy1 - fy0) + ROI_PADDING)
+
+
+def resolve_roi(roi: Union[str, BBox], page_el) -> BBox:
+    """Page-space bbox of an ROI; the "titleblock" preset is the bottom-right zone of the frame."""
+    if roi == TITLEBLOCK:
+        return titleblock_zone(frame_bbox(page_el))
+    x0, y0, x1, y1 = roi
+    return x0 - ROI_PADDING, y0 - ROI_PADDING, x1 + ROI_PADDING, y1 + ROI_PADDING
+
+
+def _outside(el, roi_bbox: BBox) -> bool:
+    bbox_str = el.get("bbox")
+    return bool(bbox_str) and not bbox_intersects(parse_bbox(bbox_str), roi_bbox)
+
+
+def _prune(parent, tags, roi_bbox: BBox) -> int:
+    removed = 0
+    for el in list(parent):
+        if el.tag == "figure":
+            # A figure straddling the ROI keeps only its primitives inside it
+            if not _outside(el, roi_bbox):
+                removed += _prune(el, FIGURE_TAGS, roi_bbox)
+                if len(el):
+                    continue
+            parent.remove(el)
+            removed += 1
+        elif el.tag in tags and _outside(el, roi_bbox):
+            parent.remove(el)
+            removed += 1
+    return removed
+
+
+def prune_page(page_el, roi_bbox: BBox) -> int:
+    """Removes the page's primitives that don't intersect the ROI; returns how many were removed.
+
+    Figures are pruned recursively and dropped once they are empty or lie outside the ROI.
+    """
+    return _prune(page_el, PRUNABLE_TAGS, roi_bbox)
@@ -11,6 +11,14 @@ class StatsCollector:
     rect_merged: int = 0
     tables_with_text: int = 0
     dup_tables_removed: int = 0
+    region_proposals: int = 0
+    lines_outside_proposals: int = 0
+    template_cache: dict = field(default_factory=dict)
+    reused_pages: int = 0
+    fonts_parsed: int = 0
+    fonts_reused: int = 0
+    font_document_hits: int = 0
+    font_seconds: float = 0.0
     row_counts: list[int] = field(default_factory=list)
     col_counts: list[int] = field(default_factory=list)
 
@@ -25,6 +33,16 @@ class StatsCollector:
     def add_rect_merged(self, n: int) -> None:
         self.rect_merged += n
 
+    def add_proposals(self, n: int, lines_dropped: int) -> None:
+        self.region_proposals += n
+        self.lines_outside_proposals += lines_dropped
+
+    def add_fonts(self, parsed: int, reused: int, document_hits: int, seconds: float) -> None:
+        self.fonts_parsed += parsed
+        self.fonts_reused += reused
+        self.font_document_hits += document_hits
+        self.font_seconds += seconds
+
     def add_table(self, rows: int, cols: int) -> None:
         self.tables_with_text += 1
         self.row_counts.append(rows)
@@ -32,7 +50,7 @@ class StatsCollector:
 
     # Final dict for Tbl‑1
     def as_summary(self) -> dict[str, str | int | float]:
-        return {
+        summary = {
             "Pages processed": self.pages,
             "Total lines": f"{self.h_lines} / {self.v_lines}",
             "Rectangles initial": self.rect_init,
@@ -41,4 +59,17 @@ class StatsCollector:
             "Duplicate tables removed": self.dup_tables_removed,
             "Avg rows per table": round(mean(self.row_counts), 2) if self.row_counts else 0,
             "Avg cols per table": round(mean(self.col_counts), 2) if self.col_counts else 0,
-        }
\ No newline at end of file
+        }
+        if self.fonts_parsed or self.fonts_reused:
+            summary["Fonts parsed / reused across documents"] = f"{self.fonts_parsed} / {self.fonts_reused}"
+            summary["Font lookups within a document"] = self.font_document_hits
+            summary["Font decoding (s)"] = round(self.font_seconds, 3)
+        if self.region_proposals or self.lines_outside_proposals:
+            summary["Region proposals"] = self.region_proposals
+            summary["Lines outside proposals"] = self.lines_outside_proposals
+        if self.reused_pages:
+            summary["Pages unchanged (reused)"] = self.reused_pages
+        if self.template_cache:
+            summary["Title-block templates (hits / misses)"] = (
+                f"{self.template_cache['hits']} / {self.template_cache['misses']}")
+        return summary
\ No newline at end of file
@@ -0,0 +1,197 @@
+# template_cache.py
+
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .roi import frame_bbox, titleblock_zone
+from .utils import BBox, parse_bbox
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_VERSION = 1
+QUANTUM = 0.5           # Fingerprint grid in PDF points
+DRIFT_TOLERANCE = 0.1   # Max offset of a template grid point from the page's lines
+
+
+def _line_bbox(line: dict) -> BBox:
+    bbox = line["bbox"]
+    x0, y0, x1, y1 = parse_bbox(bbox) if isinstance(bbox, str) else bbox
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+
+def touches(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def contains(outer: BBox, inner: BBox) -> bool:
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+
+def in_zone(point: Tuple[float, float], zone: BBox) -> bool:
+    return zone[0] <= point[0] <= zone[2] and zone[1] <= point[1] <= zone[3]
+
+
+class TemplateCache:
+    """Persistent title-block templates, keyed by a fingerprint of the lines in the title-block zone.
+
+    The zone is the bottom-right part of the drawing frame (see roi.titleblock_zone). Its lines,
+    clipped to the zone, taken relative to the frame's bottom-right corner and quantized, are
+    hashed into the fingerprint. A template stores the zone's intersections, rectangles and grid
+    cells, so sheets sharing a title-block frame skip detecting them again.
+
+    A page is only turned into a template if its zone is self-contained: every rectangle lies
+    either inside the zone or clear of it. On a hit, the template's grid points are checked
+    against the page's lines; a drifted template is evicted and the page detected from scratch.
+
+    Each template also has a `revision_table` entry, null by default. It can be set in the JSON
+    file to the revision table bbox of the sheet the template was made from. That bbox is then
+    passed on to the semantic stage instead of the hardcoded bounds.
+    """
+
+    def __init__(self, path, max_templates: int = 64):
+        self.path = Path(path)
+        self.max_templates = max_templates
+        self.templates: "OrderedDict[str, dict]" = OrderedDict()
+        self.hits = self.misses = self.stored = self.evicted = 0
+        self._carried: Dict[str, Optional[list]] = {}
+        if self.path.exists():
+            self._load()
+
+    @staticmethod
+    def locate(page_el) -> Tuple[BBox, Tuple[float, float]]:
+        """Title-block zone of a page and its anchor, the bottom-right corner of the frame."""
+        frame = frame_bbox(page_el)
+        return titleblock_zone(frame), (frame[2], frame[1])
+
+    @staticmethod
+    def fingerprint(horiz: List[dict], vert: List[dict], zone: BBox, anchor: Tuple[float, float]) -> str:
+        ax, ay = anchor
+        quantized = set()
+        for orientation, lines in (("h", horiz), ("v", vert)):
+            for line in lines:
+                x0, y0, x1, y1 = _line_bbox(line)
+                if not touches((x0, y0, x1, y1), zone):
+                    continue
+                clipped = (max(x0, zone[0]) - ax, max(y0, zone[1]) - ay,
+                           min(x1, zone[2]) - ax, min(y1, zone[3]) - ay)
+                quantized.add((orientation,) + tuple(int(round(v / QUANTUM)) for v in clipped))
+        return hashlib.sha1(repr(sorted(quantized)).encode()).hexdigest()
+
+    def lookup(self, key: str, horiz: List[dict], vert: List[dict], zone: BBox,
+               anchor: Tuple[float, float]) -> Optional[dict]:
+        """Template for a fingerprint, or None; evicts it if its grid no longer fits the page's lines."""
+        template = self.templates.get(key)
+        if template is None:
+            self.misses += 1
+            return None
+
+        if not self._fits(template, horiz, vert, zone, anchor):
+            logger.warning(f"Title-block template {key[:12]} drifted from the page lines; evicting it")
+            self.evict(key)
+            self.misses += 1
+            return None
+
+        self.templates.move_to_end(key)
+        template["hits"] = template.get("hits", 0) + 1
+        self.hits += 1
+        return template
+
+    def evict(self, key: str) -> None:
+        """Drops a template that no longer describes its pages; its revision table carries over to
+        the template stored next under the same key."""
+        template = self.templates.pop(key, None)
+        if template is not None:
+            self._carried[key] = template.get("revision_table")
+            self.evicted += 1
+
+    def _fits(self, template: dict, horiz, vert, zone, anchor) -> bool:
+        points = np.array(self.instantiate(template, anchor)["points"], dtype=float).reshape(-1, 2)
+        if len(points) == 0:
+            return True
+        h = np.array([b for b in map(_line_bbox, horiz) if touches(b, zone)], dtype=float).reshape(-1, 4)
+        v = np.array([b for b in map(_line_bbox, vert) if touches(b, zone)], dtype=float).reshape(-1, 4)
+        t = DRIFT_TOLERANCE
+        px, py = points[:, 0][:, None], points[:, 1][:, None]
+        on_h = ((np.abs(h[:, 1] - py) <= t) & (h[:, 0] - t <= px) & (px <= h[:, 2] + t)).any(axis=1)
+        on_v = ((np.abs(v[:, 0] - px) <= t) & (v[:, 1] - t <= py) & (py <= v[:, 3] + t)).any(axis=1)
+        return bool((on_h & on_v).all())
+
+    def store(self, key: str, zone: BBox, anchor: Tuple[float, float], points: List[Tuple[float, float]],
+              rects: List[dict], cells: List[dict]) -> bool:
+        """Turns a page's detection result into a template; False if the zone isn't self-contained."""
+        zone_rects = []
+        for rect in rects:
+            if contains(zone, rect["bbox"]):
+                zone_rects.append(list(rect["bbox"]))
+            elif touches(rect["bbox"], zone):
+                logger.info(f"Rectangle {rect['bbox']} straddles the title-block zone; not caching a template")
+                return False
+        if not zone_rects:
+            return False
+
+        self.templates[key] = {
+            "anchor": list(anchor),
+            "zone": list(zone),
+            "points": [list(p) for p in points if in_zone(p, zone)],
+            "rects": zone_rects,
+            "cells": [list(c["bbox"]) for c in cells if any(contains(r, c["bbox"]) for r in zone_rects)],
+            "revision_table": self._carried.pop(key, None),
+            "hits": 0,
+        }
+        self.templates.move_to_end(key)
+        while len(self.templates) > self.max_templates:
+            self.templates.popitem(last=False)
+        self.stored += 1
+        logger.info(f"Stored title-block template {key[:12]} ({len(zone_rects)} rectangles)")
+        return True
+
+    @staticmethod
+    def instantiate(template: dict, anchor: Tuple[float, float]) -> dict:
+        """Template geometry moved to a page whose frame corner is at `anchor`."""
+        dx, dy = anchor[0] - template["anchor"][0], anchor[1] - template["anchor"][1]
+
+        def move(box):
+            return tuple(round(v + (dx if i % 2 == 0 else dy), 3) for i, v in enumerate(box))
+
+        rects = []
+        for rect in template["rects"]:
+            x0, y0, x1, y1 = move(rect)
+            rects.append({"bbox": (x0, y0, x1, y1), "coords": [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]})
+
+        revision_table = template.get("revision_table")
+        return {
+            "zone": move(template["zone"]),
+            "points": [move(p) for p in template["points"]],
+            "rects": rects,
+            "cells": [{"bbox": move(c)} for c in template["cells"]],
+            "revision_table": move(revision_table) if revision_table else None,
+        }
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "stored": self.stored,
+                "evicted": self.evicted, "templates": len(self.templates)}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": TEMPLATE_VERSION, "templates": self.templates}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable title-block template cache {self.path}: {e}")
+            return
+        if data.get("version") != TEMPLATE_VERSION:
+            return
+        self.templates.update(data.get("templates", {}))
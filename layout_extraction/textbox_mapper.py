@@ -4,7 +4,7 @@ import logging
 from lxml import etree
 from typing import List, Tuple, Union
 from .data_structures import TextBox
-from .utils import parse_bbox, bbox_center, bbox_contains_point, bbox_to_str
+from .utils import parse_bbox, bbox_center, bbox_contains_point, bbox_to_str, textline_text
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +13,14 @@ BBox = Tuple[float, float, float, float]
 class TextboxMapper:
     def __init__(self, rectangles: List[dict], textbox_elements: List[etree._Element]):
         self.rectangles = rectangles
-        self.textbox_elements = [
-            tb for tb in textbox_elements
-            if "".join(text.text or "" for text in tb.xpath(".//text")).strip()
-        ]
+        # (element, bbox, text) per non-empty textbox; the text is built once, not per rectangle
+        self.textboxes = []
+        for tb in textbox_elements:
+            tbbox_str = tb.attrib.get("bbox")
+            content = " ".join(textline_text(line) for line in tb.iter("textline")).strip()
+            if tbbox_str and content:
+                self.textboxes.append((tb, parse_bbox(tbbox_str), content))
+        self.textbox_elements = [tb for tb, _, _ in self.textboxes]
 
     def _get_bbox(self, val: Union[str, BBox]) -> BBox:
         return parse_bbox(val) if isinstance(val, str) else val
@@ -30,23 +34,14 @@ class TextboxMapper:
             rect["texts"] = []
             rect["textbox_elements"] = []
 
-        for textbox_el in self.textbox_elements:
-            tbbox_str = textbox_el.attrib.get("bbox")
-            if not tbbox_str:
-                continue
-            tbbox = parse_bbox(tbbox_str)
+        for textbox_el, tbbox, content in self.textboxes:
             cx, cy = bbox_center(tbbox)
 
             for rect in self.rectangles:
                 if bbox_contains_point(rect["bbox"], cx, cy):
-                    content = " ".join(
-                        "".join(text.text or "" for text in line.xpath(".//text"))
-                        for line in textbox_el.xpath(".//textline")
-                    ).strip()
-                    if content:
-                        textbox = TextBox(bbox=tbbox, text=content, page_number=-1)
-                        rect["texts"].append(textbox)
-                        rect["textbox_elements"].append(textbox_el)
+                    textbox = TextBox(bbox=tbbox, text=content, page_number=-1)
+                    rect["texts"].append(textbox)
+                    rect["textbox_elements"].append(textbox_el)
 
         for rect in self.rectangles:
             if rect["texts"]:
@@ -30,6 +30,17 @@ def bbox_is_contained(inner: BBox, outer: BBox) -> bool:
     ox0, oy0, ox1, oy1 = outer
     return ox0 <= ix0 and oy0 <= iy0 and ox1 >= ix1 and oy1 >= iy1
 
+def bbox_intersects(a: BBox, b: BBox) -> bool:
+    """True if the boxes overlap or touch."""
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def textline_text(textline) -> str:
+    """String of a pdfminer <textline>: its own text once collapsed by the converter, else its glyphs joined."""
+    glyphs = textline.findall("text")
+    if not glyphs:
+        return textline.text or ""
+    return "".join(glyph.text or "" for glyph in glyphs)
 
 def calculate_distance_point_to_line(point: Tuple[float, float],
                                       line_start: Tuple[float, float],
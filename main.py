@@ -3,8 +3,10 @@ import time
 import argparse
 from pathlib import Path
 from layout_extraction.extraction_pipeline import LayoutExtractionPipeline
-from semantic_annotation.orchestrator import PDFLayoutProcessor
-from validator import Validator
+from layout_extraction.roi import parse_roi
+from page_selection import parse_page_spec, is_selected
+from semantic_annotation.orchestrator import PDFLayoutProcessor, ARTIFACTS
+from validator import Validator, CorpusValidator
 
 def list_pdfs(input_dir):
     return [f for f in os.listdir(input_dir) if f.lower().endswith(".pdf")]
@@ -15,23 +17,72 @@ def choose_option(options, prompt="Choose an option:"):
     idx = int(input(prompt)) - 1
     return options[idx]
 
-def find_enriched_xml(output_dir):
-    for fname in os.listdir(output_dir):
-        if fname.endswith("_enriched_output.xml"):
-            return output_dir / fname
-    raise FileNotFoundError("No enriched XML file found in output directory.")
+def find_enriched_xmls(output_dir, pages=None):
+    """The first enriched XML in the output directory, or the one of every selected page."""
+    paths = [output_dir / fname for fname in sorted(os.listdir(output_dir))
+             if fname.endswith("_enriched_output.xml") and is_selected(fname, pages)]
+    if not paths:
+        raise FileNotFoundError("No enriched XML file found in output directory.")
+    return paths if pages is not None else paths[:1]
 
 def main():
     parser = argparse.ArgumentParser(description="Run layout pipeline")
-    parser.add_argument("--debug", action="store_true", help="Enable debug output")
     parser.add_argument("--debug-dir", type=Path, help="Optional debug output directory")
+    parser.add_argument("--roi",
+                        help="Only extract a page region: 'titleblock' (bottom-right of the frame) or x0,y0,x1,y1 in PDF points")
+    parser.add_argument("--propose-regions", action="store_true",
+                        help="Only pass lines near proposed table regions to the intersection and rectangle stages")
+    parser.add_argument("--template-cache", type=Path,
+                        help="Reuse title-block grids across sheets via this JSON template cache")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-extract and re-annotate pages that changed since the last run into the same output directory")
+    parser.add_argument("--pages",
+                        help="Only process these 1-based pages, e.g. 5,12-20")
+    parser.add_argument("--keep-glyphs", action="store_true",
+                        help="Keep pdfminer's per-glyph <text> elements in the raw XML instead of one string per textline")
+    parser.add_argument("--rdf-format", choices=["turtle", "nt", "nq"], default="turtle",
+                        help="RDF output: Turtle with embedded schema, or streamed N-Triples/N-Quads")
+    parser.add_argument("--rdf-store", type=Path,
+                        help="Also upsert each page's RDF as a named graph into this SQLite quad store")
+    parser.add_argument("--search-index", type=Path,
+                        help="Also upsert title block fields and table cells into this SQLite search index")
+    parser.add_argument("--table-export", type=Path,
+                        help="Also export every table and revision table cell to this file (.parquet, .arrow or .csv)")
+    parser.add_argument("--workers", type=int,
+                        help="Worker processes for page annotation (default 1) and corpus validation (default: all cores)")
+    parser.add_argument("--artifacts", default=",".join(ARTIFACTS),
+                        help=f"Comma-separated per-page files to write (default: {','.join(ARTIFACTS)})")
+    parser.add_argument("--validate-corpus", type=Path, metavar="DIR",
+                        help="Validate every enriched XML under DIR and exit")
+    parser.add_argument("--corpus-report", type=Path, default=Path("data/output/corpus_validation.jsonl"),
+                        help="Aggregated corpus report (.jsonl, .csv or .parquet)")
     args = parser.parse_args()
+    artifacts = [a.strip() for a in args.artifacts.split(",") if a.strip()]
+    unknown = set(artifacts) - set(ARTIFACTS)
+    if unknown:
+        parser.error(f"unknown artifacts: {', '.join(sorted(unknown))}")
+    try:
+        roi = parse_roi(args.roi) if args.roi else None
+        pages = parse_page_spec(args.pages) if args.pages else None
+    except ValueError as e:
+        parser.error(str(e))
 
     input_dir = Path("data/input/")
     output_base = Path("data/output/")
     config_dir = Path("data/config/")
     isofields_path = config_dir / "iso7200_fields.json"
     rdl_ttl_path = config_dir / "ISO 15926 Part 4 - v.4.ttl"
+    rdl_cache_path = output_base / "rdl_match_cache.json"
+
+    if args.validate_corpus:
+        start_time = time.time()
+        corpus_validator = CorpusValidator(isofields_path, workers=args.workers)
+        paths = corpus_validator.find_documents(args.validate_corpus, pages)
+        print(f"Validating {len(paths)} enriched XML files under {args.validate_corpus}")
+        stats = corpus_validator.run(paths, args.corpus_report)
+        corpus_validator.print_stats(stats)
+        print(f"\nCorpus validation completed in {time.time() - start_time:.2f} seconds.")
+        return
 
     pdf_files = list_pdfs(input_dir)
     print("Select a PDF:")
@@ -51,36 +102,40 @@ def main():
     start_time = time.time()
 
     if pipeline_choice.startswith("1"):
-        pipeline = LayoutExtractionPipeline()
+        pipeline = LayoutExtractionPipeline(debug_dir=args.debug_dir, roi=roi, propose_regions=args.propose_regions,
+                                            template_cache_path=args.template_cache, incremental=args.incremental,
+                                            keep_glyphs=args.keep_glyphs, pages=pages)
         pipeline.process(input_pdf_path, output_dir)
 
     elif pipeline_choice.startswith("2"):
-        layout_proc = PDFLayoutProcessor(output_dir, isofields_path, rdl_ttl_path)
+        layout_proc = PDFLayoutProcessor(output_dir, isofields_path, rdl_ttl_path, rdl_cache_path, args.rdf_format, args.rdf_store,
+                                        args.workers or 1, artifacts,
+                                        search_index_path=args.search_index, table_export_path=args.table_export,
+                                        incremental=args.incremental, pages=pages)
         layout_proc.run()
 
     elif pipeline_choice.startswith("3"):
-        enriched_xml_path = find_enriched_xml(output_dir)
-        print(f"\nRunning Validator on: {enriched_xml_path}")
-        validator = Validator(enriched_xml_path, isofields_path)
-        validator.validate_titleblock_fields()
-        validator.print_report()
+        for enriched_xml_path in find_enriched_xmls(output_dir, pages):
+            print(f"\nRunning Validator on: {enriched_xml_path}")
+            validator = Validator(enriched_xml_path, isofields_path)
+            validator.validate_titleblock_fields()
+            validator.print_report()
 
     elif pipeline_choice.startswith("4"):
-        print(f"\n[1/3] Extracting structure from: {input_pdf_path}")
-        pipeline = LayoutExtractionPipeline(debug=args.debug, debug_dir=args.debug_dir)
+        print(f"\n[1/2] Extracting structure from: {input_pdf_path}")
+        pipeline = LayoutExtractionPipeline(debug_dir=args.debug_dir, roi=roi, propose_regions=args.propose_regions,
+                                            template_cache_path=args.template_cache, incremental=args.incremental,
+                                            keep_glyphs=args.keep_glyphs, pages=pages)
         pipeline.process(input_pdf_path, output_dir)
 
-        print(f"\n[2/3] Running annotation and enrichment on: {output_dir}")
-        layout_proc = PDFLayoutProcessor(output_dir, isofields_path, rdl_ttl_path)
+        # Validation runs inside the annotation chain on the live tree of each page
+        print(f"\n[2/2] Running annotation, enrichment and validation on: {output_dir}")
+        layout_proc = PDFLayoutProcessor(output_dir, isofields_path, rdl_ttl_path, rdl_cache_path, args.rdf_format, args.rdf_store,
+                                        args.workers or 1, artifacts, validate=True,
+                                        search_index_path=args.search_index, table_export_path=args.table_export,
+                                        incremental=args.incremental, pages=pages)
         layout_proc.run()
 
-        enriched_xml_path = find_enriched_xml(output_dir)
-        print(f"\n[3/3] Running Validator on: {enriched_xml_path}")
-        validator = Validator(enriched_xml_path, isofields_path)
-        validator.validate_titleblock_fields()
-        validator.print_report()
-        validator.write_json_report()
-
     elapsed_time = time.time() - start_time
     print(f"\nPipeline completed in {elapsed_time:.2f} seconds.")
 
@@ -0,0 +1,51 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+def fingerprint_bytes(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def fingerprint_file(path):
+    with open(path, "rb") as f:
+        return fingerprint_bytes(f.read())
+
+
+class PageManifest:
+    """Per-page fingerprints of the last run, stored as JSON in an output directory.
+
+    A page counts as unchanged if its fingerprint matches the stored one and the run settings
+    (anything that changes the output besides the page itself) are the same as last time.
+    """
+
+    def __init__(self, path, settings):
+        self.path = Path(path)
+        self.settings = settings
+        self.pages = {}
+        self._previous = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable manifest {self.path}: {e}")
+                data = {}
+            if data.get("settings") == settings:
+                self._previous = data.get("pages", {})
+
+    def unchanged(self, page, fingerprint):
+        return self._previous.get(page) == fingerprint
+
+    def record(self, page, fingerprint):
+        self.pages[page] = fingerprint
+
+    def save(self, keep_previous=False):
+        """Writes the recorded pages; with `keep_previous`, pages not seen this run keep their entries."""
+        pages = {**self._previous, **self.pages} if keep_previous else self.pages
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": self.settings, "pages": pages}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
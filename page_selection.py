@@ -0,0 +1,35 @@
+import os
+import re
+
+_PAGE_PREFIX = re.compile(r"^p(\d+)_")
+
+
+def parse_page_spec(spec):
+    """Sorted 1-based page numbers from a command-line value such as "5,12-20"."""
+    pages = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        try:
+            start, end = int(first), int(last) if sep else int(first)
+        except ValueError:
+            raise ValueError(f"Pages must look like 5,12-20, got {spec!r}")
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid page range {part!r}")
+        pages.update(range(start, end + 1))
+    if not pages:
+        raise ValueError(f"No pages in {spec!r}")
+    return sorted(pages)
+
+
+def page_number(path):
+    """Page number of a per-page output file (pNNNN_...), or None."""
+    match = _PAGE_PREFIX.match(os.path.basename(str(path)))
+    return int(match.group(1)) if match else None
+
+
+def is_selected(path, pages):
+    """Whether a per-page output file belongs to the selection; every file does without one."""
+    return pages is None or page_number(path) in pages
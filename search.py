@@ -0,0 +1,67 @@
+import os
+import time
+import argparse
+from pathlib import Path
+from semantic_annotation.search_index import SearchIndex
+
+
+def build_index(index, input_dir):
+    """Indexes every enriched XML under input_dir; the parent folder name is the PDF name."""
+    count = 0
+    for dirpath, _, filenames in os.walk(input_dir):
+        for fname in sorted(filenames):
+            if fname.endswith("_enriched_output.xml"):
+                page = fname.replace("_enriched_output.xml", "")
+                index.index_file(os.path.join(dirpath, fname), os.path.basename(dirpath), page)
+                count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search extracted title block fields and table cells")
+    parser.add_argument("query", nargs="?", help="Full-text query; every term must match")
+    parser.add_argument("--index", type=Path, default=Path("data/output/search_index.sqlite"),
+                        help="SQLite search index")
+    parser.add_argument("--key", help="Restrict to a field id or table column header (e.g. material)")
+    parser.add_argument("--kind", choices=["field", "cell"], help="Search only title block fields or table cells")
+    parser.add_argument("--field", nargs=2, metavar=("FIELD_ID", "VALUE"),
+                        help="Exact lookup: pages whose title block field equals VALUE")
+    parser.add_argument("--show", metavar="DOC_ID", help="Print the title block fields of one page (pdf/page)")
+    parser.add_argument("--build", type=Path, metavar="DIR", help="(Re)index every enriched XML under DIR")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    index = SearchIndex(args.index)
+    start_time = time.perf_counter()
+
+    if args.build:
+        count = build_index(index, args.build)
+        print(f"Indexed {count} pages from {args.build}")
+
+    if args.field:
+        for doc_id in index.documents_with_field(*args.field):
+            print(doc_id)
+
+    if args.show:
+        for field_id, value, status in index.document_fields(args.show):
+            print(f"- {field_id}: {value} ({status})")
+
+    if args.query is not None:
+        try:
+            results = index.search(args.query, key=args.key, kind=args.kind, limit=args.limit)
+        except ValueError as e:
+            index.close()
+            parser.error(str(e))
+        for doc_id, kind, key, text in results:
+            print(f"{doc_id}\t{kind}\t{key}\t{text}")
+
+    if not (args.build or args.field or args.show or args.query is not None):
+        counts = index.counts()
+        print(f"{counts['documents']} pages, {counts['fields']} fields, {counts['cells']} table cells in {args.index}")
+
+    print(f"\n({(time.perf_counter() - start_time) * 1000:.1f} ms)")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# field_matcher.py
+
+import json
+import os
+from collections import defaultdict, deque
+
+# Forms a label variant is matched in:
+#   "lower"  - variant.lower()                     (substring of a lowered text)
+#   "strip"  - variant.lower().strip()             (substring, or exact label)
+#   "tokens" - " ".join(variant.lower().split())   (a run of whole text entries)
+
+_MATCHERS = {}
+
+
+class _Automaton:
+    """Aho–Corasick automaton over a fixed list of non-empty patterns."""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for pid, pattern in enumerate(patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[node][ch] = nxt
+                node = nxt
+            self.out[node].append(pid)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def scan(self, text):
+        """Yields (end, pattern id) for every occurrence; `end` is exclusive."""
+        node = 0
+        for end, ch in enumerate(text, 1):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for pid in self.out[node]:
+                yield end, pid
+
+
+class FieldMatcher:
+    """Title-block field config compiled once into a single multi-pattern automaton.
+
+    Every label variant gets an order number (config order of fields, then variants), and all
+    lookups return the hit with the lowest order, which is the one the nested config loops
+    would have found first.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.fields = list(config)
+        self.variant_fields = []
+        self.exact_labels = set()
+        self.label_tokens = set()
+
+        patterns = {}
+        self._pattern_orders = []
+        self._empty = defaultdict(set)
+        self._colon_labels = defaultdict(set)
+        for field_index, (field_id, variants) in enumerate(config.items()):
+            for variant in variants:
+                order = len(self.variant_fields)
+                self.variant_fields.append(field_id)
+                stripped = variant.lower().strip()
+                self.exact_labels.add(stripped)
+                self._colon_labels[variant.strip().lower().rstrip(':')].add(field_index)
+                self.label_tokens.update(stripped.split())
+
+                forms = {"lower": variant.lower(), "strip": stripped, "tokens": " ".join(stripped.split())}
+                for kind, form in forms.items():
+                    if not form:
+                        self._empty[kind].add(order)
+                        continue
+                    pid = patterns.setdefault(form, len(patterns))
+                    if pid == len(self._pattern_orders):
+                        self._pattern_orders.append(defaultdict(list))
+                    self._pattern_orders[pid][kind].append(order)
+
+        self._automaton = _Automaton(list(patterns))
+        self._lengths = [len(p) for p in patterns]
+
+    @classmethod
+    def from_file(cls, json_config_path):
+        """Compiled matcher for a config file, reused until the file changes."""
+        path = os.path.abspath(json_config_path)
+        key = (path, os.path.getmtime(path))
+        matcher = _MATCHERS.get(key)
+        if matcher is None:
+            with open(path, 'r') as f:
+                matcher = cls(json.load(f))
+            _MATCHERS[key] = matcher
+        return matcher
+
+    def hits(self, text, kind):
+        """Orders of every variant whose `kind` form occurs in `text`."""
+        found = set(self._empty[kind])
+        for _, pid in self._automaton.scan(text):
+            found.update(self._pattern_orders[pid].get(kind, ()))
+        return found
+
+    def first_field(self, text, kind="lower"):
+        """Field of the first variant whose `kind` form occurs in `text`, or None."""
+        found = self.hits(text, kind)
+        return self.variant_fields[min(found)] if found else None
+
+    def is_label(self, text):
+        """True if the lowered text is exactly one of the label variants."""
+        return text.lower() in self.exact_labels
+
+    def label_fields(self, text):
+        """Fields (in config order) with a variant equal to the lowered text, ignoring trailing colons."""
+        return [self.fields[i] for i in sorted(self._colon_labels.get(text.rstrip(':'), ()))]
+
+    def match_pair(self, lowered):
+        """First variant found in either of two lowered texts.
+
+        Returns (field_id, index of the text holding the label), or None.
+        """
+        first = self.hits(lowered[0], "strip")
+        second = self.hits(lowered[1], "strip")
+        if not first and not second:
+            return None
+        order = min(first | second)
+        return self.variant_fields[order], 0 if order in first else 1
+
+    def match_window(self, lowered):
+        """First variant equal to a run of consecutive lowered texts joined by spaces.
+
+        For that variant the smallest run wins, then the leftmost. Returns (field_id, indices
+        of the run), or None.
+        """
+        starts, ends = {}, {}
+        offset = 0
+        for idx, text in enumerate(lowered):
+            starts[offset] = idx
+            offset += len(text)
+            ends[offset] = idx
+            offset += 1
+
+        best = {}
+        for end, pid in self._automaton.scan(" ".join(lowered)):
+            orders = self._pattern_orders[pid].get("tokens")
+            if not orders or end not in ends:
+                continue
+            i = starts.get(end - self._lengths[pid])
+            if i is None:
+                continue
+            span = (ends[end] - i + 1, i)
+            for order in orders:
+                if order not in best or span < best[order]:
+                    best[order] = span
+
+        if not best:
+            return None
+        order = min(best)
+        size, i = best[order]
+        return self.variant_fields[order], list(range(i, i + size))
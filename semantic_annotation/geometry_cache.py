@@ -0,0 +1,49 @@
+# geometry_cache.py
+
+import numpy as np
+from semantic_annotation.bbox_utils import parse_bbox
+
+
+class GeometryCache:
+    """Document-level side table of parsed `bbox` attributes, shared by the semantic passes.
+
+    Each element gets one row in a growing (n, 4) float array the first time it is seen. The
+    attribute string is kept next to the row, so an element whose bbox is rewritten later is
+    parsed again instead of returning stale coordinates.
+    """
+
+    def __init__(self, capacity=256):
+        self._coords = np.empty((capacity, 4))
+        self._entries = {}  # element -> (row, bbox string, coordinate tuple)
+        self.parsed = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _entry(self, elem):
+        bbox_str = elem.attrib["bbox"]
+        entry = self._entries.get(elem)
+        if entry is not None and entry[1] == bbox_str:
+            return entry
+
+        coords = tuple(parse_bbox(bbox_str))
+        self.parsed += 1
+        if entry is not None:
+            row = entry[0]
+        else:
+            row = len(self._entries)
+            if row == len(self._coords):
+                self._coords = np.concatenate((self._coords, np.empty_like(self._coords)))
+        self._coords[row] = coords
+        entry = (row, bbox_str, coords)
+        self._entries[elem] = entry
+        return entry
+
+    def bbox(self, elem):
+        """(x0, y0, x1, y1) of `elem` as Python floats."""
+        return self._entry(elem)[2]
+
+    def bboxes(self, elems):
+        """(len(elems), 4) array with the bboxes of `elems`, in order."""
+        rows = [self._entry(elem)[0] for elem in elems]
+        return self._coords[rows].reshape(-1, 4)
@@ -0,0 +1,67 @@
+# grid_assignment.py
+
+import numpy as np
+
+
+def cluster_1d(values, tol):
+    """Clusters values with a sorted gap sweep: a new cluster starts wherever the gap to the
+    previous sorted value exceeds `tol`.
+
+    Returns (labels, centers); clusters are numbered in ascending order of value.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return np.empty(0, dtype=int), np.empty(0)
+
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+    sorted_labels = np.concatenate(([0], np.cumsum(np.diff(sorted_values) > tol)))
+
+    labels = np.empty_like(sorted_labels)
+    labels[order] = sorted_labels
+    centers = np.bincount(sorted_labels, weights=sorted_values) / np.bincount(sorted_labels)
+    return labels, centers
+
+
+GRID_ATTRS = ("row", "col", "rowspan", "colspan")
+
+
+def assign_grid(bboxes, row_tol=1.0, col_tol=1.0):
+    """Row/column indices and spans for an (n, 4) array of cell bboxes in PDF coordinates.
+
+    Numbered like the layout stage's grid (attach_cell_grids): the cell edges are clustered into
+    grid lines, rows are numbered top-down from a cell's top edge (y1) and columns left-to-right
+    from its left edge (x0); spans count the grid lines a cell crosses.
+
+    Returns (rows, cols, rowspans, colspans) as integer arrays.
+    """
+    bboxes = np.asarray(bboxes, dtype=float).reshape(-1, 4)
+    n = len(bboxes)
+    x0, y0, x1, y1 = bboxes.T
+
+    x_labels, _ = cluster_1d(np.concatenate((x0, x1)), col_tol)
+    y_labels, y_centers = cluster_1d(np.concatenate((y0, y1)), row_tol)
+    y_labels = len(y_centers) - 1 - y_labels  # top-down
+
+    rows, cols = y_labels[n:], x_labels[:n]
+    rowspans = y_labels[:n] - rows
+    colspans = x_labels[n:] - cols
+    return rows, cols, np.maximum(rowspans, 1), np.maximum(colspans, 1)
+
+
+def cell_grid(cells, bboxes, row_tol=1.0, col_tol=1.0):
+    """Row/column indices and spans of cell elements.
+
+    Cells keep the grid attributes carried over from the layout stage; only cells without them
+    are numbered by assign_grid over all the bboxes. Returns (rows, cols, rowspans, colspans).
+    """
+    grid = np.empty((len(cells), 4), dtype=int)
+    missing = []
+    for i, cell in enumerate(cells):
+        try:
+            grid[i] = [int(cell.attrib[k]) for k in GRID_ATTRS]
+        except (KeyError, ValueError):
+            missing.append(i)
+    if missing:
+        grid[missing] = np.column_stack(assign_grid(bboxes, row_tol, col_tol))[missing]
+    return tuple(grid.T)
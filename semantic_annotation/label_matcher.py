@@ -0,0 +1,97 @@
+# label_matcher.py
+
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+
+def _trigrams(text):
+    return Counter(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def _min_matches(len_a, len_b, cutoff):
+    """Smallest matching-character count M with SequenceMatcher ratio 2M/(len_a+len_b) >= cutoff.
+
+    Returns None if no M <= min(len_a, len_b) can reach the cutoff.
+    """
+    total = len_a + len_b
+    if total == 0:
+        return 0
+    m = max(0, int(cutoff * total / 2) - 1)
+    while 2.0 * m / total < cutoff:
+        m += 1
+    return m if m <= min(len_a, len_b) else None
+
+
+def _min_shared_trigrams(len_q, len_c, matches):
+    """Lower bound on trigrams a query shares with a candidate, given M matching characters.
+
+    Every query trigram that lies inside one matching block also occurs in the candidate.
+    An unmatched query character breaks at most 3 trigrams, and a block boundary that is
+    not caused by an unmatched query character needs an unmatched candidate character
+    and breaks at most 2 more.
+    """
+    if len_q < 3:
+        return 0
+    return (len_q - 2) - 3 * (len_q - matches) - 2 * (len_c - matches)
+
+
+class LabelMatcher:
+    """Drop-in replacement for get_close_matches(query, labels, n=1, cutoff) over a fixed label set.
+
+    Labels are indexed by length and by character trigram. A query is only scored against
+    labels whose length and trigram overlap still allow the cutoff ratio, and those are scored
+    exactly as difflib does, so the result is identical to the full scan.
+    """
+
+    def __init__(self, labels, cutoff=0.9):
+        self.labels = list(labels)
+        self.cutoff = cutoff
+        self._lengths = [len(label) for label in self.labels]
+        self._by_length = defaultdict(list)
+        self._postings = defaultdict(list)
+        for idx, label in enumerate(self.labels):
+            self._by_length[len(label)].append(idx)
+            for gram, count in _trigrams(label).items():
+                self._postings[gram].append((idx, count))
+
+    def candidates(self, query, cutoff=None):
+        """Indices (in label order) of every label that could reach `cutoff` against `query`."""
+        cutoff = self.cutoff if cutoff is None else cutoff
+        len_q = len(query)
+
+        selected = []
+        required = {}
+        for len_c, bucket in self._by_length.items():
+            matches = _min_matches(len_q, len_c, cutoff)
+            if matches is None:
+                continue
+            need = _min_shared_trigrams(len_q, len_c, matches)
+            if need <= 0:
+                selected.extend(bucket)
+            else:
+                required[len_c] = need
+
+        if required:
+            shared = defaultdict(int)
+            for gram, q_count in _trigrams(query).items():
+                for idx, c_count in self._postings.get(gram, ()):
+                    if self._lengths[idx] in required:
+                        shared[idx] += min(q_count, c_count)
+            selected.extend(idx for idx, n in shared.items() if n >= required[self._lengths[idx]])
+
+        selected.sort()
+        return selected
+
+    def match(self, query):
+        """Best label with ratio >= cutoff, or None. Same tie-breaking as difflib.get_close_matches."""
+        s = SequenceMatcher()
+        s.set_seq2(query)
+        best = None
+        for idx in self.candidates(query):
+            x = self.labels[idx]
+            s.set_seq1(x)
+            if s.real_quick_ratio() >= self.cutoff and s.quick_ratio() >= self.cutoff:
+                score = s.ratio()
+                if score >= self.cutoff and (best is None or (score, x) > best):
+                    best = (score, x)
+        return best[1] if best else None
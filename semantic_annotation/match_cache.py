@@ -0,0 +1,91 @@
+# match_cache.py
+
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+_MISSING = object()
+
+
+class MatchCache:
+    """LRU memo of normalized text → matched RDL label (or None), tied to one RDL index version.
+
+    Optionally persisted as JSON between runs; a file written for another index version is ignored.
+    With `track_delta`, newly computed entries are also collected so a worker process can hand
+    them back to the parent's cache.
+    """
+
+    def __init__(self, version, maxsize=50000, path=None, track_delta=False):
+        self.version = version
+        self.maxsize = maxsize
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._added = {} if track_delta else None
+        if self.path and self.path.exists():
+            self._load()
+
+    def lookup(self, key, compute):
+        value = self._entries.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+        self.misses += 1
+        value = compute(key)
+        self._entries[key] = value
+        if self._added is not None:
+            self._added[key] = value
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+    def take_delta(self):
+        """Entries computed and hit/miss counts since the last call, for merging into another cache."""
+        delta = {"entries": list((self._added or {}).items()), "hits": self.hits, "misses": self.misses}
+        if self._added is not None:
+            self._added = {}
+        self.hits = self.misses = 0
+        return delta
+
+    def merge(self, delta):
+        for key, value in delta["entries"]:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        self.hits += delta["hits"]
+        self.misses += delta["misses"]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def save(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "entries": list(self._entries.items())}, f)
+        os.replace(tmp_path, self.path)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable RDL match cache {self.path}: {e}")
+            return
+        if data.get("version") != self.version:
+            return
+        for key, value in data.get("entries", [])[-self.maxsize:]:
+            self._entries[key] = value
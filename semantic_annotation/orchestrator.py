@@ -1,78 +1,310 @@
 # orchestrator.py
 
 import os
+from concurrent.futures import ProcessPoolExecutor
 from lxml import etree
-from semantic_annotation.intersection_loader import IntersectionLoader
+from semantic_annotation.field_matcher import FieldMatcher
+from semantic_annotation.geometry_cache import GeometryCache
 from semantic_annotation.region_classifier import RegionClassifier
-from semantic_annotation.margin_utils import extract_margin_lines
-from semantic_annotation.table_structurer import TableStructurer, recursively_indent, merge_column_texts, merge_cell_texts_by_y0
+from semantic_annotation.margin_utils import read_margin_lines, read_revision_table_bounds
+from semantic_annotation.table_structurer import TableStructurer, recursively_indent, merge_column_texts, merge_cell_texts_by_y0, strip_blank_text
 from semantic_annotation.title_block import TitleBlockOrganizer
 from semantic_annotation.rdl_mapper import RDLMapper
-from semantic_annotation.rdf_builder import RDFBuilder
-  
+from semantic_annotation.rdf_builder import RDFBuilder, RDF_FORMATS, document_graph_uri
+from semantic_annotation.rdf_store import QuadStore
+from semantic_annotation.search_index import SearchIndex, extract_search_records
+from semantic_annotation.table_export import TableExporter, extract_table_records
+from validator import Validator
+from page_manifest import PageManifest, fingerprint_file
+from page_selection import is_selected
+
+# Per-page files the annotation chain can write; the tree itself is passed along in memory
+ARTIFACTS = ("debug", "structured", "enriched", "rdf")
+
+# Read-only state of a worker process, loaded once by _init_worker
+_worker_state = {}
+
+
+def _load_shared_state(isofields_path, rdl_ttl_path, rdl_cache_path, rdf_format, pdf_name, track_delta=False):
+    """Field matcher, RDL mapper and RDF builder shared by every page a process annotates."""
+    FieldMatcher.from_file(isofields_path)
+    rdl_mapper = RDLMapper(rdl_ttl_path, cache_path=rdl_cache_path, track_delta=track_delta)
+
+    try:
+        rdf_builder = RDFBuilder(schema_path=rdl_ttl_path, rdf_format=rdf_format)
+    except Exception as e:
+        print(f"⚠️ RDF schema loading failed for {pdf_name}: {e}")
+        rdf_builder = None
+
+    return {"rdl_mapper": rdl_mapper, "rdf_builder": rdf_builder}
+
+
+def _init_worker(*args):
+    _worker_state.update(_load_shared_state(*args, track_delta=True))
+
+
+def _write_xml(root, path):
+    tmp_path = f"{path}.tmp"
+    etree.ElementTree(root).write(tmp_path, pretty_print=True, encoding="utf-8", xml_declaration=True)
+    os.replace(tmp_path, path)
+
+
+def page_paths(output_dir, page_prefix, rdf_format):
+    """Input rectangles XML and every artifact file of a page."""
+    return {
+        "rects": os.path.join(output_dir, f"{page_prefix}_rectangles_merged.xml"),
+        "debug": os.path.join(output_dir, f"{page_prefix}_structured_debug.xml"),
+        "structured": os.path.join(output_dir, f"{page_prefix}_structured_output.xml"),
+        "enriched": os.path.join(output_dir, f"{page_prefix}_enriched_output.xml"),
+        "rdf": os.path.join(output_dir, f"{page_prefix}_output.{RDF_FORMATS[rdf_format]}"),
+    }
+
+
+def annotate_page(state, output_dir, page_prefix, isofields_path, rdf_format, pdf_name, artifacts=ARTIFACTS,
+                  validate=False, collect_triples=False, collect_search=False, collect_tables=False):
+    """Runs the semantic stage for one page on a single live tree.
+
+    Only the files named in `artifacts` are written. With `validate`, the title block fields
+    are checked in the chain; with `collect_triples` / `collect_search` / `collect_tables`, the
+    page's triples, search records and table cells are returned for the parent's outputs.
+    """
+    paths = page_paths(output_dir, page_prefix, rdf_format)
+    rects_path, debug_path, enriched_path = paths["rects"], paths["debug"], paths["enriched"]
+    output_path, rdf_path = paths["structured"], paths["rdf"]
+
+    print(f"\n📄 Processing {page_prefix}")
+    result = {"page": page_prefix, "enriched_path": enriched_path}
+
+    # Parse rectangles
+    rect_tree = etree.parse(rects_path)
+    rect_root = rect_tree.getroot()
+
+    # Bboxes are parsed once per page and shared by every pass below
+    geometry = GeometryCache()
+
+    # Assign texts to the cell grid from the layout stage
+    rect_root = RegionClassifier(rect_root, geometry).apply()
+    if rect_root is None:
+        raise RuntimeError("RegionClassifier returned None")
+
+    # Margin lines found by the layout stage
+    bottom_line_bbox, right_line_bbox = read_margin_lines(rect_root)
+    revision_bounds = read_revision_table_bounds(rect_root)
+
+    # Classify tables and fields
+    TableStructurer(rect_root, bottom_line_bbox, right_line_bbox, geometry).apply()
+    TitleBlockOrganizer(rect_root, geometry).detect_revision_table(revision_bounds)
+
+    merge_column_texts(rect_root, geometry)
+    merge_cell_texts_by_y0(rect_root, geometry=geometry)
+
+    # Save debug version
+    if "debug" in artifacts:
+        _write_xml(rect_root, debug_path)
+
+    TitleBlockOrganizer(rect_root, geometry).detect_titleblock_fields(isofields_path)
+
+    if "structured" in artifacts:
+        recursively_indent(rect_root)
+        _write_xml(rect_root, output_path)
+        print(f"✅ Saved structured XML: {output_path}")
+        strip_blank_text(rect_root)
+
+    # RDL enrichment
+    root = state["rdl_mapper"].enrich_root(rect_root)
+    if "enriched" in artifacts:
+        _write_xml(root, enriched_path)
+        print(f"✨ Enriched with RDL: {enriched_path}")
+
+    # === RDF Generation ===
+    rdf_builder = state["rdf_builder"]
+    if rdf_builder is not None and "rdf" in artifacts:
+        try:
+            rdf_builder.generate_rdf_from_root(root, rdf_path)
+        except Exception as e:
+            print(f"⚠️ RDF generation failed for {pdf_name}: {e}")
+
+    _collect(state, root, result, isofields_path, pdf_name, validate, collect_triples, collect_search, collect_tables)
+    return result
+
+
+def reuse_page(state, output_dir, page_prefix, isofields_path, rdf_format, pdf_name, artifacts=ARTIFACTS,
+               validate=False, collect_triples=False, collect_search=False, collect_tables=False):
+    """Result for a page unchanged since the last run; its files are kept and only what the
+    parent collects is re-read from the enriched XML."""
+    enriched_path = page_paths(output_dir, page_prefix, rdf_format)["enriched"]
+    print(f"\n♻️ Keeping {page_prefix} (unchanged since the last run)")
+    result = {"page": page_prefix, "enriched_path": enriched_path, "reused": True}
+    if validate or collect_triples or collect_search or collect_tables:
+        root = etree.parse(enriched_path).getroot()
+        _collect(state, root, result, isofields_path, pdf_name, validate, collect_triples, collect_search,
+                 collect_tables)
+    return result
+
+
+def _collect(state, root, result, isofields_path, pdf_name, validate, collect_triples, collect_search,
+             collect_tables):
+    """Validation and the per-page records the parent merges into its stores."""
+    rdf_builder = state["rdf_builder"]
+    if rdf_builder is not None and collect_triples:
+        try:
+            result["triples"] = list(rdf_builder.iter_triples(root))
+        except Exception as e:
+            print(f"⚠️ RDF generation failed for {pdf_name}: {e}")
+
+    # === Validation ===
+    if validate:
+        validator = Validator.from_root(root, isofields_path, result["enriched_path"])
+        validator.validate_titleblock_fields()
+        validator.print_report()
+        validator.write_json_report()
+        result["validation"] = validator.report
+
+    if collect_search:
+        result["search_records"] = extract_search_records(root)
+
+    if collect_tables:
+        result["table_records"] = extract_table_records(root)
+
+
+def _annotate_page_in_worker(*args):
+    result = annotate_page(_worker_state, *args)
+    result["cache_delta"] = _worker_state["rdl_mapper"].cache.take_delta()
+    return result
+
 
 class PDFLayoutProcessor:
-    def __init__(self, output_dir, isofields_path, rdl_ttl_path):
+    def __init__(self, output_dir, isofields_path, rdl_ttl_path, rdl_cache_path=None, rdf_format="turtle",
+                 rdf_store_path=None, workers=1, artifacts=ARTIFACTS, validate=False, search_index_path=None,
+                 table_export_path=None, incremental=False, pages=None):
         self.output_dir = output_dir
         self.isofields_path = isofields_path
         self.rdl_ttl_path = rdl_ttl_path
+        self.rdl_cache_path = rdl_cache_path
+        self.rdf_format = rdf_format
+        self.rdf_store_path = rdf_store_path
+        self.workers = workers
+        self.artifacts = tuple(artifacts)
+        self.validate = validate
+        self.search_index_path = search_index_path
+        self.table_export_path = table_export_path
+        self.incremental = incremental
+        self.pages = pages
+        self.stats = {}
+
+    def page_prefixes(self):
+        """Pages with a rectangles file, limited to `pages` (1-based numbers) if given."""
+        return sorted(
+            filename.replace("_rectangles_merged.xml", "")
+            for filename in os.listdir(self.output_dir)
+            if filename.endswith("_rectangles_merged.xml") and is_selected(filename, self.pages)
+        )
 
     def run(self):
-        for filename in os.listdir(self.output_dir):
-            if not filename.endswith("_rectangles_merged.xml"):
-                continue
-
-            page_prefix = filename.replace("_rectangles_merged.xml", "")
-            rects_path = os.path.join(self.output_dir, filename)
-            intersections_path = os.path.join(self.output_dir, f"{page_prefix}_intersections.xml")
-            raw_path = os.path.join(self.output_dir, "raw_output.xml")
-            debug_path = os.path.join(self.output_dir, f"{page_prefix}_structured_debug.xml")
-            output_path = os.path.join(self.output_dir, f"{page_prefix}_structured_output.xml")
-            enriched_path = os.path.join(self.output_dir, f"{page_prefix}_enriched_output.xml")
-
-            print(f"\n📄 Processing {page_prefix}")
-
-            # Load intersections
-            intersections = IntersectionLoader(intersections_path).load()
-
-            # Parse rectangles
-            rect_tree = etree.parse(rects_path)
-            rect_root = rect_tree.getroot()
-
-            # Generate structured rectangles
-            rect_root = RegionClassifier(rect_root, intersections).apply()
-            if rect_root is None:
-                raise RuntimeError("RegionClassifier returned None")
-
-            # Margin lines
-            bottom_line_bbox, right_line_bbox = extract_margin_lines(raw_path)
-
-            # Classify tables and fields
-            TableStructurer(rect_root, bottom_line_bbox, right_line_bbox).apply()
-            TitleBlockOrganizer(rect_root).detect_revision_table()
-
-            merge_column_texts(rect_root)
-            merge_cell_texts_by_y0(rect_root)
-            
-
-            # Save debug version
-            etree.ElementTree(rect_root).write(debug_path, pretty_print=True, encoding="utf-8", xml_declaration=True)
-
-            TitleBlockOrganizer(rect_root).detect_titleblock_fields(self.isofields_path)
-            
-            recursively_indent(rect_root)
-
-            etree.ElementTree(rect_root).write(output_path, pretty_print=True, encoding="utf-8", xml_declaration=True)
-            print(f"✅ Saved structured XML: {output_path}")
-
-            # RDL enrichment
-            rdl_mapper = RDLMapper(self.rdl_ttl_path)
-            rdl_mapper.enrich(output_path, enriched_path)
-
-            pdf_name = self.output_dir.name
-            # === RDF Generation ===
-            try:
-                rdf_builder = RDFBuilder(schema_path=self.rdl_ttl_path)
-                rdf_builder.generate_rdf_from_xml(pdf_name)
-            except Exception as e:
-                print(f"⚠️ RDF generation failed for {pdf_name}: {e}")
+        pdf_name = os.path.basename(os.path.normpath(self.output_dir))
+        shared_args = (self.isofields_path, self.rdl_ttl_path, self.rdl_cache_path, self.rdf_format, pdf_name)
+
+        # Shared across pages so repeated strings are matched against the RDL only once
+        state = _load_shared_state(*shared_args)
+        rdl_mapper, rdf_builder = state["rdl_mapper"], state["rdf_builder"]
+
+        if rdf_builder is not None and self.rdf_format != "turtle":
+            # Streaming outputs reference one shared schema file instead of embedding it per page
+            rdf_builder.write_schema(os.path.join(os.path.dirname(os.path.normpath(self.output_dir)), "schema.nt"))
+
+        rdf_store = QuadStore(self.rdf_store_path) if self.rdf_store_path and rdf_builder else None
+        if rdf_store is not None:
+            rdf_builder.store_schema(rdf_store)
+
+        search_index = SearchIndex(self.search_index_path) if self.search_index_path else None
+        table_exporter = TableExporter(self.table_export_path) if self.table_export_path else None
+
+        pages = self.page_prefixes()
+        collect = (rdf_store is not None, search_index is not None, table_exporter is not None)
+        page_args = {
+            page: (self.output_dir, page, self.isofields_path, self.rdf_format, pdf_name, self.artifacts,
+                   self.validate, *collect)
+            for page in pages
+        }
+
+        # Pages whose rectangles and settings are unchanged keep last run's files
+        manifest = self._manifest() if self.incremental else None
+        if manifest is not None:
+            reused = []
+            for page in pages:
+                fingerprint = fingerprint_file(page_paths(self.output_dir, page, self.rdf_format)["rects"])
+                manifest.record(page, fingerprint)
+                if manifest.unchanged(page, fingerprint) and self._has_outputs(page, any(collect)):
+                    reused.append(page)
+            for page in reused:
+                result = reuse_page(state, *page_args.pop(page))
+                self._store_page(rdf_store, rdf_builder, search_index, table_exporter, pdf_name, result)
+            self.stats["reused_pages"] = len(reused)
+        page_args = list(page_args.values())
+
+        if self.workers > 1 and len(page_args) > 1:
+            # Each worker loads the read-only state once; the parent only merges results
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(page_args)), initializer=_init_worker,
+                                     initargs=shared_args) as pool:
+                results = pool.map(_annotate_page_in_worker, *zip(*page_args))
+                for result in results:
+                    rdl_mapper.cache.merge(result["cache_delta"])
+                    self._store_page(rdf_store, rdf_builder, search_index, table_exporter, pdf_name, result)
+        else:
+            for args in page_args:
+                result = annotate_page(state, *args)
+                self._store_page(rdf_store, rdf_builder, search_index, table_exporter, pdf_name, result)
+
+        if rdf_store is not None:
+            rdf_store.close()
+        if search_index is not None:
+            self.stats["search_index"] = search_index.counts()
+            search_index.close()
+        if table_exporter is not None:
+            export_path = table_exporter.write()
+            self.stats["table_export"] = {"path": export_path, "cells": len(table_exporter)}
+            print(f"📦 Exported {len(table_exporter)} table cells: {export_path}")
+
+        if manifest is not None:
+            manifest.save(keep_previous=self.pages is not None)
+
+        rdl_mapper.cache.save()
+        self.stats["pages"] = len(pages)
+        self.stats["rdl_match_cache"] = rdl_mapper.cache.stats()
+        cache_stats = self.stats["rdl_match_cache"]
+        print(f"\n📊 RDL match cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+              f"({cache_stats['hit_rate']:.0%} hit rate, {cache_stats['entries']} entries)")
+
+    def _manifest(self):
+        """Manifest of the last annotation run; changed inputs or settings invalidate every page."""
+        settings = {
+            "isofields": fingerprint_file(self.isofields_path),
+            "rdl": [str(self.rdl_ttl_path), os.path.getmtime(self.rdl_ttl_path), os.path.getsize(self.rdl_ttl_path)],
+            "rdf_format": self.rdf_format,
+            "artifacts": sorted(self.artifacts),
+        }
+        return PageManifest(os.path.join(self.output_dir, "annotation_manifest.json"), settings)
+
+    def _has_outputs(self, page, collecting):
+        paths = page_paths(self.output_dir, page, self.rdf_format)
+        needed = set(self.artifacts)
+        if self.validate or collecting:
+            needed.add("enriched")
+        return all(os.path.exists(paths[artifact]) for artifact in needed)
+
+    def _store_page(self, rdf_store, rdf_builder, search_index, table_exporter, pdf_name, result):
+        if self.validate:
+            self.stats.setdefault("validation", {})[result["page"]] = result["validation"]
+
+        # SQLite allows one writer, so the stores are only ever updated from the parent process
+        if search_index is not None:
+            search_index.upsert(pdf_name, result["page"], result["search_records"], source=result["enriched_path"])
+            print(f"🔎 Indexed {result['page']} for search")
+
+        if table_exporter is not None:
+            table_exporter.add(pdf_name, result["page"], result["table_records"])
+
+        if rdf_store is None or "triples" not in result:
+            return
+        graph_uri = document_graph_uri(pdf_name, result["page"])
+        rdf_builder.store_document(rdf_store, graph_uri, result["enriched_path"], triples=result["triples"])
@@ -1,174 +1,323 @@
 from lxml import etree
-from rdflib import Graph, Namespace, URIRef, Literal
+from rdflib import Graph, Namespace, URIRef, Literal, BNode
 from rdflib.namespace import RDF, RDFS
-import uuid
+import hashlib
 import os
+from urllib.parse import quote
 
 # Namespaces
 GAD = Namespace("http://industrialgraph.org/gad-schema#")
 RDL = Namespace("http://rdl.posccaesar.org/")
 
+RDF_FORMATS = {"turtle": "ttl", "nt": "nt", "nq": "nq"}
+
+SCHEMA_GRAPH = URIRef(f"{GAD}graph/schema")
+
+_IRI_ESCAPES = set('<>"{}|^`\\ ')
+
+
+def nt_term(term):
+    """Serializes a URIRef/Literal/BNode as an N-Triples term."""
+    if isinstance(term, URIRef):
+        return "<" + "".join(
+            f"\\u{ord(ch):04X}" if ch in _IRI_ESCAPES or ord(ch) < 0x20 else ch for ch in str(term)
+        ) + ">"
+    if isinstance(term, BNode):
+        return f"_:{term}"
+    value = (
+        str(term)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+    if term.language:
+        return f'"{value}"@{term.language}'
+    if term.datatype:
+        return f'"{value}"^^<{term.datatype}>'
+    return f'"{value}"'
+
+
+def content_digest(root):
+    """Digest of an XML tree that ignores indentation, so a parsed file and the live tree it was
+    written from produce the same URIs."""
+    digest = hashlib.sha1()
+    for el in root.iter(tag=etree.Element):
+        key = (el.tag, sorted(el.attrib.items()), (el.text or "").strip(), (el.tail or "").strip())
+        digest.update(repr(key).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def document_graph_uri(pdf_name, page_prefix):
+    """Stable named-graph URI for one page of one drawing, used as the upsert key in a QuadStore."""
+    return URIRef(f"{GAD}graph/{quote(str(pdf_name))}/{quote(str(page_prefix))}")
+
+
+class DocumentContext:
+    """Per-document state behind generated URIs: the content key and each element's position."""
+
+    def __init__(self, root):
+        self.doc_key = content_digest(root)[:12]
+        self.ordinals = {el: i for i, el in enumerate(root.iter())}
+
+
 class RDFBuilder:
-    def __init__(self, schema_path="schema.ttl"):
+    def __init__(self, schema_path="schema.ttl", rdf_format="turtle"):
+        if rdf_format not in RDF_FORMATS:
+            raise ValueError(f"Unsupported RDF format '{rdf_format}', expected one of {list(RDF_FORMATS)}")
         self.schema_path = schema_path
+        self.rdf_format = rdf_format
         self.graph = Graph()
         self.graph.bind("gad", GAD)
         self.graph.bind("rdl", RDL)
-        self.graph.parse(self.schema_path, format="turtle")
-        print(f"✅ Loaded schema from {self.schema_path}")
+        # Streaming formats write the schema once via write_schema() instead of into every document
+        if rdf_format == "turtle":
+            self.graph.parse(self.schema_path, format="turtle")
+            print(f"✅ Loaded schema from {self.schema_path}")
 
-    def generate_uri(self, entity_type: str) -> URIRef:
-        return URIRef(f"{GAD}{entity_type}_{uuid.uuid4().hex[:8]}")
+    def generate_uri(self, entity_type: str, elem, doc: DocumentContext) -> URIRef:
+        """Content-derived URI: document hash plus the element's position, id and bbox."""
+        key = f"{doc.ordinals.get(elem)}|{elem.get('id', '')}|{elem.get('bbox', '')}"
+        suffix = hashlib.sha1(key.encode("utf-8")).hexdigest()[:10]
+        return URIRef(f"{GAD}{entity_type}_{doc.doc_key}_{suffix}")
 
-    def generate_rdf_from_xml(self, pdf_name: str):
+    def generate_rdf_from_xml(self, pdf_name: str, xml_path=None, output_path=None):
         input_dir = f"data/output/{pdf_name}/"
 
-        enriched_files = [f for f in os.listdir(input_dir) if f.endswith("_enriched_output.xml")]
-        if not enriched_files:
-            raise FileNotFoundError(f"No enriched XML found in {input_dir}")
-        
-        xml_path = os.path.join(input_dir, enriched_files[0])
-        output_path = os.path.join(input_dir, "output.ttl")
+        if xml_path is None:
+            enriched_files = [f for f in os.listdir(input_dir) if f.endswith("_enriched_output.xml")]
+            if not enriched_files:
+                raise FileNotFoundError(f"No enriched XML found in {input_dir}")
+            xml_path = os.path.join(input_dir, enriched_files[0])
+        if output_path is None:
+            output_path = os.path.join(input_dir, f"output.{RDF_FORMATS[self.rdf_format]}")
+
+        root = etree.parse(xml_path).getroot()
+        self.generate_rdf_from_root(root, output_path)
+
+    def generate_rdf_from_root(self, root, output_path):
+        """Writes the RDF of an already parsed (or live) document tree."""
+        if self.rdf_format == "turtle":
+            graph = Graph()
+            graph.bind("gad", GAD)
+            graph.bind("rdl", RDL)
+            graph += self.graph
+            for triple in self.iter_triples(root):
+                graph.add(triple)
+            tmp_path = f"{output_path}.tmp"
+            graph.serialize(destination=tmp_path, format="turtle")
+            os.replace(tmp_path, output_path)
+            print(f"✅ Combined RDF+Schema written to: {output_path}")
+        else:
+            count = self.write_ntriples(root, output_path)
+            print(f"✅ Streamed {count} triples to: {output_path}")
+
+    def write_ntriples(self, root, output_path, graph_uri=None):
+        """Writes the document's triples line by line (N-Quads when rdf_format is 'nq')."""
+        tmp_path = f"{output_path}.tmp"
+        doc = DocumentContext(root)
+        graph_term = nt_term(graph_uri or self.generate_uri("Document", root, doc))
+        count = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for s, p, o in self.iter_triples(root, doc):
+                line = f"{nt_term(s)} {nt_term(p)} {nt_term(o)}"
+                if self.rdf_format == "nq":
+                    line = f"{line} {graph_term}"
+                f.write(f"{line} .\n")
+                count += 1
+        os.replace(tmp_path, output_path)
+        return count
+
+    def write_schema(self, output_path):
+        """Writes the schema once as N-Triples, skipping it if the file is already up to date.
+
+        The first line is a comment with the schema's content hash, which is what staleness is judged by.
+        """
+        header = f"# schema sha256 {self.schema_digest()}\n"
+        if os.path.exists(output_path):
+            with open(output_path, encoding="utf-8") as f:
+                if f.readline() == header:
+                    return
+        schema = Graph()
+        schema.parse(self.schema_path, format="turtle")
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(header)
+            f.write(schema.serialize(format="nt"))
+        os.replace(tmp_path, output_path)
+        print(f"✅ Schema written to: {output_path}")
 
-        tree = etree.parse(xml_path)
-        root = tree.getroot()
+    def store_document(self, store, graph_uri, xml_path=None, root=None, triples=None):
+        """Replaces the document's named graph in a persistent QuadStore.
 
-        doc_uri = self.generate_uri("Document")
-        self.graph.add((doc_uri, RDF.type, GAD.Document))
+        The triples come from `triples` if given, else from `root`, else from parsing `xml_path`.
+        """
+        if triples is None:
+            if root is None:
+                root = etree.parse(xml_path).getroot()
+            triples = self.iter_triples(root)
+        count = store.replace_graph(graph_uri, triples, source=xml_path)
+        print(f"✅ Stored {count} triples in graph <{graph_uri}>")
+        return count
+
+    def schema_digest(self):
+        """SHA-256 of the schema file, so stored copies can tell when it has changed."""
+        digest = hashlib.sha256()
+        with open(self.schema_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def store_schema(self, store):
+        """Loads the schema into its own named graph, replacing it whenever the schema file changes.
+
+        The graph's source records the schema's content hash.
+        """
+        source = f"{self.schema_path}#sha256={self.schema_digest()}"
+        if store.graph_source(SCHEMA_GRAPH) == source:
+            return
+        schema = Graph()
+        schema.parse(self.schema_path, format="turtle")
+        store.replace_graph(SCHEMA_GRAPH, schema, source=source)
+        print(f"✅ Schema stored in graph <{SCHEMA_GRAPH}>")
+
+    def iter_triples(self, root, doc: DocumentContext = None):
+        """Yields the document's triples; URIs depend only on the XML content."""
+        doc = doc or DocumentContext(root)
+
+        doc_uri = self.generate_uri("Document", root, doc)
+        yield (doc_uri, RDF.type, GAD.Document)
 
         # === Titleblock ===
         tb_el = root.find("titleblock")
         if tb_el is not None:
-            tb_uri = self.generate_uri("TitleBlock")
-            self.graph.add((doc_uri, GAD.hasTitleBlock, tb_uri))
-            self.graph.add((tb_uri, RDF.type, GAD.TitleBlock))
+            tb_uri = self.generate_uri("TitleBlock", tb_el, doc)
+            yield (doc_uri, GAD.hasTitleBlock, tb_uri)
+            yield (tb_uri, RDF.type, GAD.TitleBlock)
 
             # Document metadata
             metadata = tb_el.find("document_metadata")
             if metadata is not None:
                 for prop in metadata.findall("document_property"):
-                    prop_uri = self.generate_uri("DocumentProperty")
-                    self.graph.add((tb_uri, GAD.hasProperty, prop_uri))
-                    self.graph.add((prop_uri, RDF.type, GAD.DocumentProperty))
+                    prop_uri = self.generate_uri("DocumentProperty", prop, doc)
+                    yield (tb_uri, GAD.hasProperty, prop_uri)
+                    yield (prop_uri, RDF.type, GAD.DocumentProperty)
 
                     prop_id = prop.attrib.get("id")
                     bbox = prop.attrib.get("bbox")
                     value = (prop.text or "").strip()
 
                     if prop_id:
-                        self.graph.add((prop_uri, GAD.hasId, Literal(prop_id)))
-                        self.graph.add((prop_uri, GAD.hasLabel, Literal(prop_id)))
+                        yield (prop_uri, GAD.hasId, Literal(prop_id))
+                        yield (prop_uri, GAD.hasLabel, Literal(prop_id))
                     if bbox:
-                        self.graph.add((prop_uri, GAD.hasBoundingBox, Literal(bbox)))
+                        yield (prop_uri, GAD.hasBoundingBox, Literal(bbox))
                     if value:
-                        self.graph.add((prop_uri, GAD.hasValue, Literal(value)))
+                        yield (prop_uri, GAD.hasValue, Literal(value))
 
             for cell in tb_el.findall("cell"):
-                cell_uri = self.generate_uri("Cell")
-                self.graph.add((tb_uri, GAD.hasCell, cell_uri))
-                self.graph.add((cell_uri, RDF.type, GAD.Cell))
-                self.graph.add((cell_uri, GAD.hasBoundingBox, Literal(cell.attrib["bbox"])))
+                cell_uri = self.generate_uri("Cell", cell, doc)
+                yield (tb_uri, GAD.hasCell, cell_uri)
+                yield (cell_uri, RDF.type, GAD.Cell)
+                yield (cell_uri, GAD.hasBoundingBox, Literal(cell.attrib["bbox"]))
 
                 for text in cell.findall("text"):
-                    text_uri = self.generate_uri("TextElement")
-                    self.graph.add((cell_uri, GAD.hasText, text_uri))
-                    self.graph.add((text_uri, RDF.type, GAD.TextElement))
-                    self.graph.add((text_uri, RDFS.label, Literal(text.text.strip())))
-                    self.graph.add((text_uri, GAD.hasBoundingBox, Literal(text.attrib["bbox"])))
+                    text_uri = self.generate_uri("TextElement", text, doc)
+                    yield (cell_uri, GAD.hasText, text_uri)
+                    yield (text_uri, RDF.type, GAD.TextElement)
+                    yield (text_uri, RDFS.label, Literal(text.text.strip()))
+                    yield (text_uri, GAD.hasBoundingBox, Literal(text.attrib["bbox"]))
                     rdl = text.find("rdl:uri", namespaces={"rdl": "https://posccaesar.org/15926-4/v4/reference-data-item/"})
                     if rdl is not None:
-                        self.graph.add((text_uri, GAD.linkedToRDL, URIRef(rdl.text)))
+                        yield (text_uri, GAD.linkedToRDL, URIRef(rdl.text))
 
             for rev_table in tb_el.findall("revision_table"):
-                rev_uri = self.generate_uri("RevisionTable")
-                self.graph.add((tb_uri, GAD.hasRevisionTable, rev_uri))
-                self.graph.add((rev_uri, RDF.type, GAD.RevisionTable))
-                self.graph.add((rev_uri, GAD.hasBoundingBox, Literal(rev_table.attrib["bbox"])))
+                rev_uri = self.generate_uri("RevisionTable", rev_table, doc)
+                yield (tb_uri, GAD.hasRevisionTable, rev_uri)
+                yield (rev_uri, RDF.type, GAD.RevisionTable)
+                yield (rev_uri, GAD.hasBoundingBox, Literal(rev_table.attrib["bbox"]))
 
                 for row in rev_table.findall("row"):
                     row_id = row.attrib.get("id")
-                    row_uri = URIRef(f"{GAD}{row_id}") if row_id else self.generate_uri("Row")
-                    self.graph.add((rev_uri, GAD.hasRow, row_uri))
-                    self.graph.add((row_uri, RDF.type, GAD.Row))
+                    row_uri = self.generate_uri("Row", row, doc)
+                    yield (rev_uri, GAD.hasRow, row_uri)
+                    yield (row_uri, RDF.type, GAD.Row)
                     if row_id:
-                        self.graph.add((row_uri, GAD.hasId, Literal(row_id)))
+                        yield (row_uri, GAD.hasId, Literal(row_id))
 
                     for col in row.findall("column"):
                         col_id = col.attrib.get("id")
-                        col_uri = URIRef(f"{GAD}{col_id}") if col_id else self.generate_uri("Column")
-                        self.graph.add((row_uri, GAD.hasColumn, col_uri))
-                        self.graph.add((col_uri, RDF.type, GAD.Column))
+                        col_uri = self.generate_uri("Column", col, doc)
+                        yield (row_uri, GAD.hasColumn, col_uri)
+                        yield (col_uri, RDF.type, GAD.Column)
                         if col_id:
-                            self.graph.add((col_uri, GAD.hasId, Literal(col_id))) 
+                            yield (col_uri, GAD.hasId, Literal(col_id))
 
                         for text in col.findall("text"):
-                            text_uri = self.generate_uri("TextElement")
-                            self.graph.add((col_uri, GAD.hasText, text_uri))
-                            self.graph.add((text_uri, RDF.type, GAD.TextElement))
-                            self.graph.add((text_uri, RDFS.label, Literal(text.text.strip())))
-                            self.graph.add((text_uri, GAD.hasBoundingBox, Literal(text.attrib["bbox"])))
+                            text_uri = self.generate_uri("TextElement", text, doc)
+                            yield (col_uri, GAD.hasText, text_uri)
+                            yield (text_uri, RDF.type, GAD.TextElement)
+                            yield (text_uri, RDFS.label, Literal(text.text.strip()))
+                            yield (text_uri, GAD.hasBoundingBox, Literal(text.attrib["bbox"]))
                             rdl = text.find("rdl:uri", namespaces={"rdl": "https://posccaesar.org/15926-4/v4/reference-data-item/"})
                             if rdl is not None:
-                                self.graph.add((text_uri, GAD.linkedToRDL, URIRef(rdl.text)))
+                                yield (text_uri, GAD.linkedToRDL, URIRef(rdl.text))
 
         # === Tabular Section ===
         tabular = root.find("tabular_section")
         if tabular is not None:
-            ts_uri = self.generate_uri("TabularSection")
-            self.graph.add((doc_uri, GAD.hasTabularSection, ts_uri))
-            self.graph.add((ts_uri, RDF.type, GAD.TabularSection))
+            ts_uri = self.generate_uri("TabularSection", tabular, doc)
+            yield (doc_uri, GAD.hasTabularSection, ts_uri)
+            yield (ts_uri, RDF.type, GAD.TabularSection)
 
             for table in tabular.findall("table"):
                 table_id = table.attrib.get("id")
-                table_uri = URIRef(f"{GAD}{table_id}") if table_id else self.generate_uri("Table")
-                self.graph.add((ts_uri, GAD.hasTable, table_uri))
-                self.graph.add((table_uri, RDF.type, GAD.Table))
-                self.graph.add((table_uri, GAD.hasBoundingBox, Literal(table.attrib["bbox"])))
+                table_uri = self.generate_uri("Table", table, doc)
+                yield (ts_uri, GAD.hasTable, table_uri)
+                yield (table_uri, RDF.type, GAD.Table)
+                yield (table_uri, GAD.hasBoundingBox, Literal(table.attrib["bbox"]))
                 if table_id:
-                    self.graph.add((table_uri, GAD.hasId, Literal(table_id)))
+                    yield (table_uri, GAD.hasId, Literal(table_id))
                 
                 header_el = table.find("header")
                 if header_el is not None:
-                    header_uri = self.generate_uri("Header")
-                    self.graph.add((table_uri, GAD.hasHeader, header_uri))
-                    self.graph.add((header_uri, RDF.type, GAD.Header))
-                    self.graph.add((header_uri, RDFS.label, Literal(header_el.text.strip())))
-                    self.graph.add((header_uri, GAD.hasBoundingBox, Literal(header_el.attrib["bbox"])))
+                    header_uri = self.generate_uri("Header", header_el, doc)
+                    yield (table_uri, GAD.hasHeader, header_uri)
+                    yield (header_uri, RDF.type, GAD.Header)
+                    yield (header_uri, RDFS.label, Literal(header_el.text.strip()))
+                    yield (header_uri, GAD.hasBoundingBox, Literal(header_el.attrib["bbox"]))
                     
                 for row in table.findall("row"):
                     row_id = row.attrib.get("id")
-                    row_uri = URIRef(f"{GAD}{row_id}") if row_id else self.generate_uri("Row")
-                    self.graph.add((table_uri, GAD.hasRow, row_uri))
-                    self.graph.add((row_uri, RDF.type, GAD.Row))
+                    row_uri = self.generate_uri("Row", row, doc)
+                    yield (table_uri, GAD.hasRow, row_uri)
+                    yield (row_uri, RDF.type, GAD.Row)
                     if row_id:
-                        self.graph.add((row_uri, GAD.hasId, Literal(row_id)))
+                        yield (row_uri, GAD.hasId, Literal(row_id))
 
                     for col in row.findall("column"):
                         col_id = col.attrib.get("id")
-                        col_uri = URIRef(f"{GAD}{col_id}") if col_id else self.generate_uri("Column")
-                        self.graph.add((row_uri, GAD.hasColumn, col_uri))
-                        self.graph.add((col_uri, RDF.type, GAD.Column))
+                        col_uri = self.generate_uri("Column", col, doc)
+                        yield (row_uri, GAD.hasColumn, col_uri)
+                        yield (col_uri, RDF.type, GAD.Column)
                         if col_id:
-                            self.graph.add((col_uri, GAD.hasId, Literal(col_id)))
+                            yield (col_uri, GAD.hasId, Literal(col_id))
 
                         for text in col.findall("text"):
-                            text_uri = self.generate_uri("TextElement")
-                            self.graph.add((col_uri, GAD.hasText, text_uri))
-                            self.graph.add((text_uri, RDF.type, GAD.TextElement))
-                            self.graph.add((text_uri, RDFS.label, Literal(text.text.strip())))
-                            self.graph.add((text_uri, GAD.hasBoundingBox, Literal(text.attrib["bbox"])))
+                            text_uri = self.generate_uri("TextElement", text, doc)
+                            yield (col_uri, GAD.hasText, text_uri)
+                            yield (text_uri, RDF.type, GAD.TextElement)
+                            yield (text_uri, RDFS.label, Literal(text.text.strip()))
+                            yield (text_uri, GAD.hasBoundingBox, Literal(text.attrib["bbox"]))
                             rdl = text.find("rdl:uri", namespaces={"rdl": "https://posccaesar.org/15926-4/v4/reference-data-item/"})
                             if rdl is not None:
-                                self.graph.add((text_uri, GAD.linkedToRDL, URIRef(rdl.text)))
+                                yield (text_uri, GAD.linkedToRDL, URIRef(rdl.text))
                                 
                         # Attach RDL annotations directly to column if present
                         rdl_label_el = col.find("{https://posccaesar.org/15926-4/v4/reference-data-item/}label")
                         rdl_uri_el = col.find("{https://posccaesar.org/15926-4/v4/reference-data-item/}uri")
 
                         if rdl_label_el is not None and rdl_label_el.text:
-                            self.graph.add((col_uri, GAD.hasRdlLabel, Literal(rdl_label_el.text.strip())))
+                            yield (col_uri, GAD.hasRdlLabel, Literal(rdl_label_el.text.strip()))
                         if rdl_uri_el is not None and rdl_uri_el.text:
-                            self.graph.add((col_uri, GAD.hasRdlUri, URIRef(rdl_uri_el.text.strip())))
-
-        self.graph.serialize(destination=output_path, format="turtle")
-        print(f"✅ Combined RDF+Schema written to: {output_path}")
+                            yield (col_uri, GAD.hasRdlUri, URIRef(rdl_uri_el.text.strip()))
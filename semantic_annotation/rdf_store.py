@@ -0,0 +1,87 @@
+# rdf_store.py
+
+import sqlite3
+from datetime import datetime, timezone
+from semantic_annotation.rdf_builder import nt_term
+
+
+class QuadStore:
+    """Persistent corpus-wide quad store backed by SQLite, one named graph per document.
+
+    Terms are stored in their N-Triples form. Replacing a document only touches its own graph,
+    and pattern queries stream rows from disk instead of loading the corpus into memory.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS graphs (
+                g TEXT PRIMARY KEY,
+                source TEXT,
+                triples INTEGER NOT NULL,
+                updated TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS quads (
+                g TEXT NOT NULL,
+                s TEXT NOT NULL,
+                p TEXT NOT NULL,
+                o TEXT NOT NULL,
+                PRIMARY KEY (g, s, p, o)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS quads_spo ON quads (s, p, o);
+            CREATE INDEX IF NOT EXISTS quads_po ON quads (p, o);
+            CREATE INDEX IF NOT EXISTS quads_o ON quads (o);
+        """)
+
+    def replace_graph(self, graph_uri, triples, source=None):
+        """Atomically replaces the named graph with `triples` (rdflib terms). Returns the triple count."""
+        g = nt_term(graph_uri)
+        with self.conn:
+            self.conn.execute("DELETE FROM quads WHERE g = ?", (g,))
+            cur = self.conn.executemany(
+                "INSERT OR IGNORE INTO quads VALUES (?, ?, ?, ?)",
+                ((g, nt_term(s), nt_term(p), nt_term(o)) for s, p, o in triples),
+            )
+            count = cur.rowcount
+            self.conn.execute(
+                "INSERT OR REPLACE INTO graphs VALUES (?, ?, ?, ?)",
+                (g, str(source) if source else None, count, datetime.now(timezone.utc).isoformat()),
+            )
+        return count
+
+    def remove_graph(self, graph_uri):
+        g = nt_term(graph_uri)
+        with self.conn:
+            self.conn.execute("DELETE FROM quads WHERE g = ?", (g,))
+            self.conn.execute("DELETE FROM graphs WHERE g = ?", (g,))
+
+    def has_graph(self, graph_uri):
+        row = self.conn.execute("SELECT 1 FROM graphs WHERE g = ?", (nt_term(graph_uri),)).fetchone()
+        return row is not None
+
+    def graph_source(self, graph_uri):
+        """The source recorded for a named graph, or None if the store doesn't have it."""
+        row = self.conn.execute("SELECT source FROM graphs WHERE g = ?", (nt_term(graph_uri),)).fetchone()
+        return row[0] if row else None
+
+    def graphs(self):
+        return [g[1:-1] for (g,) in self.conn.execute("SELECT g FROM graphs ORDER BY g")]
+
+    def triples(self, s=None, p=None, o=None, graph=None):
+        """Yields (s, p, o, g) N-Triples strings matching the pattern; None is a wildcard."""
+        clauses, params = [], []
+        for column, term in (("s", s), ("p", p), ("o", o), ("g", graph)):
+            if term is not None:
+                clauses.append(f"{column} = ?")
+                params.append(nt_term(term))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        yield from self.conn.execute(f"SELECT s, p, o, g FROM quads{where}", params)
+
+    def export_nquads(self, output_path):
+        with open(output_path, "w", encoding="utf-8") as f:
+            for s, p, o, g in self.conn.execute("SELECT s, p, o, g FROM quads ORDER BY g"):
+                f.write(f"{s} {p} {o} {g} .\n")
+
+    def close(self):
+        self.conn.close()
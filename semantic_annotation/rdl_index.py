@@ -0,0 +1,123 @@
+# rdl_index.py
+
+import hashlib
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from pathlib import Path
+
+INDEX_SCHEMA_VERSION = "2"
+
+
+class RDLLabelIndex:
+    """On-disk label → URI/comment table compiled once from the ISO 15926 Part 4 TTL.
+
+    The SQLite file is keyed by the SHA-256 of the TTL it was built from and is
+    recompiled automatically when the TTL changes.
+    """
+
+    def __init__(self, ttl_path, index_path=None):
+        self.ttl_path = Path(ttl_path)
+        self.index_path = Path(index_path) if index_path else self.ttl_path.with_name(self.ttl_path.name + ".labels.sqlite")
+        self.version = None
+
+    def load(self):
+        """Returns {LABEL: {"uri": ..., "comment": ...}}, compiling the index first if it is stale."""
+        self.version = self._current_version()
+        if self.version is None:
+            self.version = self.compile()
+
+        with closing(sqlite3.connect(self.index_path)) as conn:
+            rows = conn.execute("SELECT label, uri, comment FROM labels").fetchall()
+        return {label: {"uri": uri, "comment": comment} for label, uri, comment in rows}
+
+    def compile(self):
+        """Parses the TTL once with rdflib and writes the label table. Returns the TTL hash."""
+        import rdflib
+
+        source_hash = self._hash_source()
+        print(f"⏳ Compiling RDL label index from {self.ttl_path} ...")
+
+        graph = rdflib.Graph()
+        graph.parse(str(self.ttl_path), format="ttl")
+
+        # Sorted so that when two subjects share a label, the smallest URI wins on every run
+        rows = {}
+        for s in sorted(set(graph.subjects(rdflib.RDFS.label, None)), key=str):
+            label = min(graph.objects(s, rdflib.RDFS.label), key=str)
+            if not label:
+                continue
+            comment = min(graph.objects(s, rdflib.RDFS.comment), key=str, default=None)
+            rows.setdefault(str(label).strip().upper(), (str(s), str(comment) if comment is not None else None))
+
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE labels (label TEXT PRIMARY KEY, uri TEXT NOT NULL, comment TEXT) WITHOUT ROWID")
+            conn.executemany(
+                "INSERT INTO labels VALUES (?, ?, ?)",
+                ((label, uri, comment) for label, (uri, comment) in rows.items()),
+            )
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", self._meta_rows(source_hash).items())
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, self.index_path)
+
+        print(f"✅ Compiled {len(rows)} RDL labels → {self.index_path}")
+        return source_hash
+
+    def _current_version(self):
+        """Returns the stored TTL hash if the index is up to date, else None."""
+        if not self.index_path.exists():
+            return None
+        try:
+            with closing(sqlite3.connect(self.index_path)) as conn:
+                meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        except sqlite3.DatabaseError:
+            return None
+
+        if meta.get("schema_version") != INDEX_SCHEMA_VERSION:
+            return None
+
+        # Cheap check first: unchanged size and mtime means an unchanged file.
+        stat = self.ttl_path.stat()
+        if meta.get("ttl_size") == str(stat.st_size) and meta.get("ttl_mtime_ns") == str(stat.st_mtime_ns):
+            return meta.get("ttl_sha256")
+
+        source_hash = self._hash_source()
+        if meta.get("ttl_sha256") != source_hash:
+            return None
+
+        # Same content with a new mtime (e.g. a fresh checkout): refresh the stat fields.
+        with closing(sqlite3.connect(self.index_path)) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", self._meta_rows(source_hash).items())
+        return source_hash
+
+    def _meta_rows(self, source_hash):
+        stat = self.ttl_path.stat()
+        return {
+            "schema_version": INDEX_SCHEMA_VERSION,
+            "ttl_sha256": source_hash,
+            "ttl_size": str(stat.st_size),
+            "ttl_mtime_ns": str(stat.st_mtime_ns),
+        }
+
+    def _hash_source(self):
+        digest = hashlib.sha256()
+        with open(self.ttl_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python -m semantic_annotation.rdl_index <rdl.ttl> [index.sqlite]")
+        sys.exit(1)
+    index = RDLLabelIndex(*sys.argv[1:])
+    index.compile()
@@ -1,31 +1,34 @@
+import os
 from lxml import etree
-import rdflib
-from difflib import SequenceMatcher, get_close_matches
+from difflib import SequenceMatcher
+from semantic_annotation.rdl_index import RDLLabelIndex
+from semantic_annotation.label_matcher import LabelMatcher
+from semantic_annotation.match_cache import MatchCache
 
 class RDLMapper:
-    def __init__(self, ttl_path):
+    def __init__(self, ttl_path, index_path=None, cache_path=None, cache_size=50000, track_delta=False):
         self.ttl_path = ttl_path
-        self.graph = rdflib.Graph()
-        self.graph.parse(ttl_path, format="ttl")
-        self.rdl_info = self._extract_rdl_info()
-
-    def _extract_rdl_info(self):
-        rdl_info = {}
-        for s in self.graph.subjects():
-            label = self.graph.value(s, rdflib.RDFS.label)
-            if label:
-                label_str = str(label).strip().upper()
-                rdl_info[label_str] = {
-                    "uri": str(s),
-                    "comment": str(self.graph.value(s, rdflib.RDFS.comment)) if (s, rdflib.RDFS.comment, None) in self.graph else None,
-                }
-        return rdl_info
+        self.index = RDLLabelIndex(ttl_path, index_path)
+        self.rdl_info = self.index.load()
+        self.matcher = LabelMatcher(self.rdl_info.keys(), cutoff=0.9)
+        self.cache = MatchCache(self.index.version, cache_size, cache_path, track_delta)
+        self._title_cache = {}
 
     def enrich(self, xml_input_path, xml_output_path):
         parser = etree.XMLParser(remove_blank_text=True)
-        tree = etree.parse(xml_input_path, parser)
-        root = tree.getroot()
+        root = etree.parse(xml_input_path, parser).getroot()
+        root = self.enrich_root(root)
 
+        tmp_path = f"{xml_output_path}.tmp"
+        etree.ElementTree(root).write(tmp_path, pretty_print=True, encoding="utf-8", xml_declaration=True)
+        os.replace(tmp_path, xml_output_path)
+        print(f"✨ Enriched with RDL: {xml_output_path}")
+
+    def enrich_root(self, root):
+        """Enriches a parsed document in place and returns its root (a new one if xmlns:rdl was added).
+
+        The tree should not carry indentation whitespace, see strip_blank_text().
+        """
         # Add xmlns:rdl if missing
         nsmap = root.nsmap.copy()
         if 'rdl' not in nsmap:
@@ -35,22 +38,11 @@ class RDLMapper:
             for k, v in root.attrib.items():
                 new_root.set(k, v)
             root = new_root
-            tree._setroot(root)
 
         # Try document-level classification
         title_field = root.xpath(".//document_property[@id='document_title']")
         if title_field:
-            title_text = title_field[0].text.strip().upper()
-            tokens = title_text.split()
-            ngrams = [" ".join(tokens[i:i+n]) for n in range(2, 6) for i in range(len(tokens)-n+1)]
-            best_match = None
-            best_score = 0
-            for phrase in ngrams:
-                for label in self.rdl_info:
-                    score = SequenceMatcher(None, phrase, label).ratio()
-                    if score > best_score and score > 0.8:
-                        best_match = label
-                        best_score = score
+            best_match = self.classify_title(title_field[0].text)
             if best_match:
                 root.set("type", best_match)
 
@@ -59,9 +51,8 @@ class RDLMapper:
         for text_elem in text_elements:
             if text_elem.text:
                 label = text_elem.text.strip().upper()
-                matches = get_close_matches(label, self.rdl_info.keys(), n=1, cutoff=0.9)
-                if matches:
-                    match = matches[0]
+                match = self.cache.lookup(label, self.matcher.match)
+                if match is not None:
                     info = self.rdl_info[match]
 
                     label_elem = etree.Element("{https://posccaesar.org/15926-4/v4/reference-data-item/}label")
@@ -81,8 +72,36 @@ class RDLMapper:
         for table_elem in root.findall(".//table"):
             self.propagate_labels_from_header(table_elem)
 
-        tree.write(xml_output_path, pretty_print=True, encoding="utf-8", xml_declaration=True)
-        print(f"✨ Enriched with RDL: {xml_output_path}")
+        return root
+
+    def classify_title(self, title_text):
+        """Best RDL label (ratio > 0.8) for any 2–5-gram of the title, memoized per normalized title."""
+        tokens = title_text.strip().upper().split()
+        key = " ".join(tokens)
+        if key not in self._title_cache:
+            self._title_cache[key] = self._best_title_label(tokens)
+        return self._title_cache[key]
+
+    def _best_title_label(self, tokens):
+        ngrams = [" ".join(tokens[i:i+n]) for n in range(2, 6) for i in range(len(tokens)-n+1)]
+        best_match = None
+        best_score = 0
+        for phrase in ngrams:
+            # Only labels that could still beat the current best are scored; the shortlist is
+            # in label order, so ties resolve exactly as in a full scan.
+            for idx in self.matcher.candidates(phrase, max(best_score, 0.8)):
+                label = self.matcher.labels[idx]
+                bound = max(best_score, 0.8)
+                s = SequenceMatcher(None, phrase, label)
+                if s.real_quick_ratio() <= bound or s.quick_ratio() <= bound:
+                    continue
+                score = s.ratio()
+                if score > best_score and score > 0.8:
+                    best_match = label
+                    best_score = score
+            if best_score == 1.0:
+                break
+        return best_match
 
     def propagate_labels_from_header(self, table_elem):
         rows = table_elem.findall('row')
@@ -1,51 +1,83 @@
 # pipeline/rectangle_processor.py
+import math
+from collections import defaultdict
+from statistics import median
 from lxml import etree
-from semantic_annotation.bbox_utils import parse_bbox, bbox_contains, point_inside_bbox
+from semantic_annotation.bbox_utils import bbox_contains
+from semantic_annotation.geometry_cache import GeometryCache
+from semantic_annotation.grid_assignment import GRID_ATTRS
+
+
+class _AnchorGrid:
+    """Buckets text anchors (x0, y0) into uniform bins so a cell only checks the texts near it."""
+
+    def __init__(self, anchors, bin_w, bin_h):
+        self.anchors = anchors
+        self.bin_w = max(bin_w, 1.0)
+        self.bin_h = max(bin_h, 1.0)
+        self.bins = defaultdict(list)
+        for i, (x, y) in enumerate(anchors):
+            self.bins[(math.floor(x / self.bin_w), math.floor(y / self.bin_h))].append(i)
+
+    def query(self, x0, y0, x1, y1):
+        """Indices (in input order) of anchors inside [x0, x1] × [y0, y1]."""
+        found = []
+        for bx in range(math.floor(x0 / self.bin_w), math.floor(x1 / self.bin_w) + 1):
+            for by in range(math.floor(y0 / self.bin_h), math.floor(y1 / self.bin_h) + 1):
+                for i in self.bins.get((bx, by), ()):
+                    x, y = self.anchors[i]
+                    if x0 <= x <= x1 and y0 <= y <= y1:
+                        found.append(i)
+        found.sort()
+        return found
+
 
 class RegionClassifier:
-    def __init__(self, root, intersection_points):
+    def __init__(self, root, geometry=None):
         self.root = root
-        self.intersection_points = intersection_points
+        self.geometry = geometry if geometry is not None else GeometryCache()
 
     def apply(self):
         for rect in self.root.findall("rectangle"):
-            bbox = parse_bbox(rect.attrib["bbox"])
             rect_texts = rect.findall("text")
 
-            # Add intersection points inside rectangle
-            local_points = [
-                (x, y) for (x, y) in self.intersection_points
-                if point_inside_bbox(x, y, bbox)
+            # Cell grid detected in the layout stage
+            cells = []
+            for cell in rect.findall("cell"):
+                x0, y0, x1, y1 = self.geometry.bbox(cell)
+                grid = {k: cell.attrib[k] for k in GRID_ATTRS if k in cell.attrib}
+                cells.append((x0, y0, x1, y1, grid))
+                rect.remove(cell)
+
+            if cells:
+                self._assign_texts(rect, rect_texts, cells)
+        return self.root
+
+    def _assign_texts(self, rect, rect_texts, cells):
+        text_data = [{"bbox": self.geometry.bbox(t), "element": t} for t in rect_texts]
+        text_index = _AnchorGrid(
+            [(td["bbox"][0], td["bbox"][1]) for td in text_data],
+            median(x1 - x0 for x0, _, x1, _, _ in cells),
+            median(y1 - y0 for _, y0, _, y1, _ in cells),
+        )
+        used_texts = set()
+
+        for (x0, y0, x1, y1, grid) in cells:
+            cell_bbox = [x0, y0, x1, y1]
+            inside_texts = [
+                text_data[i] for i in text_index.query(x0, y0, x1, y1)
+                if bbox_contains(cell_bbox, text_data[i]["bbox"])
             ]
-            for x, y in local_points:
-                etree.SubElement(rect, "intersection", attrib={"x": str(x), "y": str(y)})
+            if inside_texts:
+                cell_elem = etree.Element("cell", attrib={"bbox": f"{x0:.2f},{y0:.2f},{x1:.2f},{y1:.2f}", **grid})
+                for td in inside_texts:
+                    text = etree.Element("text", attrib={
+                        "bbox": ",".join(f"{v:.3f}" for v in td["bbox"])
+                    })
+                    text.text = td["element"].text
+                    cell_elem.append(text)
+                    used_texts.add(td["element"])
+                rect.append(cell_elem)
 
-            # Detect grid cells based on intersections
-            cells = []
-            for (x0, y0) in local_points:
-                right = sorted([(x, y0) for (x, y) in local_points if y == y0 and x > x0], key=lambda p: p[0])
-                below = sorted([(x0, y) for (x, y) in local_points if x == x0 and y > y0], key=lambda p: p[1])
-                if right and below:
-                    cells.append((x0, y0, right[0][0], below[0][1]))
-
-            # Assign text to cells
-            text_data = [{"bbox": parse_bbox(t.attrib["bbox"]), "element": t} for t in rect_texts]
-            used_texts = set()
-
-            for (x0, y0, x1, y1) in cells:
-                cell_bbox = [x0, y0, x1, y1]
-                inside_texts = [td for td in text_data if bbox_contains(cell_bbox, td["bbox"])]
-                if inside_texts:
-                    cell_elem = etree.Element("cell", attrib={"bbox": f"{x0:.2f},{y0:.2f},{x1:.2f},{y1:.2f}"})
-                    for td in inside_texts:
-                        text = etree.Element("text", attrib={
-                            "bbox": ",".join(f"{v:.3f}" for v in td["bbox"])
-                        })
-                        text.text = td["element"].text
-                        cell_elem.append(text)
-                        used_texts.add(td["element"])
-                    rect.append(cell_elem)
-
-            for txt in used_texts:
-                rect.remove(txt)
-        return self.root
\ No newline at end of file
+        for txt in used_texts:
+            rect.remove(txt)
@@ -0,0 +1,186 @@
+# search_index.py
+
+import sqlite3
+from datetime import datetime, timezone
+from lxml import etree
+from validator import field_status
+
+
+def _joined_text(elem):
+    return " ".join(t.text.strip() for t in elem.findall("text") if t.text and t.text.strip())
+
+
+def extract_search_records(root):
+    """Title block fields and table cells of an enriched document, as plain tuples.
+
+    Returns {"document_type", "fields": [(field_id, value, status)], "cells": [(table_id, row,
+    col, header, text)]}. Header is the text of the column in the table's first row.
+    """
+    fields = []
+    for prop in root.iter("document_property"):
+        value = (prop.text or "").strip()
+        fields.append((prop.get("id"), value, field_status(value)))
+
+    tables = [(table.get("id"), table) for table in root.iter("table")]
+    tables += [(f"rev{i}", table) for i, table in enumerate(root.iter("revision_table"))]
+
+    cells = []
+    for table_id, table in tables:
+        headers = []
+        for row_index, row in enumerate(table.findall("row")):
+            for col_index, column in enumerate(row.findall("column")):
+                text = _joined_text(column)
+                if row_index == 0:
+                    headers.append(text)
+                header = headers[col_index] if col_index < len(headers) else ""
+                if text:
+                    cells.append((table_id, row_index, col_index, header, text))
+
+    return {"document_type": root.get("type"), "fields": fields, "cells": cells}
+
+
+def _fts_query(text):
+    """Every whitespace-separated term as a quoted FTS5 string, ANDed together."""
+    if not text or not text.strip():
+        raise ValueError("Search query is empty")
+    return " AND ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+class SearchIndex:
+    """Corpus-wide SQLite index of title block fields and table cells, one entry per page.
+
+    Fields and cells are kept in plain tables for exact lookups and mirrored into an FTS5
+    table for full-text search. The FTS5 table takes its content from `search_content`, which
+    is indexed by doc_id, so re-indexing a page deletes its old entries by rowid instead of
+    scanning the full-text table. Re-indexing a page replaces everything stored for it.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id TEXT PRIMARY KEY,
+                pdf TEXT NOT NULL,
+                page TEXT NOT NULL,
+                document_type TEXT,
+                source TEXT,
+                updated TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fields (
+                doc_id TEXT NOT NULL,
+                field_id TEXT NOT NULL,
+                value TEXT NOT NULL,
+                status TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cells (
+                doc_id TEXT NOT NULL,
+                table_id TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                col INTEGER NOT NULL,
+                header TEXT NOT NULL,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS fields_doc ON fields (doc_id);
+            CREATE INDEX IF NOT EXISTS fields_value ON fields (field_id, value COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS cells_doc ON cells (doc_id);
+            CREATE TABLE IF NOT EXISTS search_content (
+                id INTEGER PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS search_content_doc ON search_content (doc_id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(
+                doc_id UNINDEXED, kind UNINDEXED, key, text, content='search_content', content_rowid='id'
+            );
+        """)
+
+    @staticmethod
+    def document_id(pdf_name, page):
+        return f"{pdf_name}/{page}"
+
+    def upsert(self, pdf_name, page, records, source=None):
+        """Replaces the page's entries with `records` (see extract_search_records). Returns the doc id."""
+        doc_id = self.document_id(pdf_name, page)
+        with self.conn:
+            self._delete(doc_id)
+            self.conn.execute(
+                "INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                (doc_id, str(pdf_name), str(page), records["document_type"],
+                 str(source) if source else None, datetime.now(timezone.utc).isoformat()),
+            )
+            self.conn.executemany(
+                "INSERT INTO fields VALUES (?, ?, ?, ?)",
+                ((doc_id, field_id, value, status) for field_id, value, status in records["fields"]),
+            )
+            self.conn.executemany(
+                "INSERT INTO cells VALUES (?, ?, ?, ?, ?, ?)",
+                ((doc_id, *cell) for cell in records["cells"]),
+            )
+            self.conn.executemany(
+                "INSERT INTO search_content (doc_id, kind, key, text) VALUES (?, ?, ?, ?)",
+                [(doc_id, "field", field_id, value) for field_id, value, _ in records["fields"] if value]
+                + [(doc_id, "cell", header, text) for _, _, _, header, text in records["cells"]],
+            )
+            self.conn.execute(
+                "INSERT INTO search (rowid, doc_id, kind, key, text) "
+                "SELECT id, doc_id, kind, key, text FROM search_content WHERE doc_id = ?",
+                (doc_id,),
+            )
+        return doc_id
+
+    def index_file(self, xml_path, pdf_name, page):
+        root = etree.parse(str(xml_path)).getroot()
+        return self.upsert(pdf_name, page, extract_search_records(root), source=xml_path)
+
+    def remove(self, pdf_name, page):
+        with self.conn:
+            self._delete(self.document_id(pdf_name, page))
+
+    def _delete(self, doc_id):
+        # External-content FTS5 entries are removed by rowid, with the values they were indexed with
+        self.conn.execute(
+            "INSERT INTO search (search, rowid, doc_id, kind, key, text) "
+            "SELECT 'delete', id, doc_id, kind, key, text FROM search_content WHERE doc_id = ?",
+            (doc_id,),
+        )
+        for table in ("documents", "fields", "cells", "search_content"):
+            self.conn.execute(f"DELETE FROM {table} WHERE doc_id = ?", (doc_id,))
+
+    def search(self, text, key=None, kind=None, limit=50):
+        """Full-text search; `key` restricts to a field id or column header, `kind` to 'field' or 'cell'.
+
+        Returns (doc_id, kind, key, text) rows, best match first. Raises ValueError for a blank query.
+        """
+        expression = f"text : ({_fts_query(text)})"
+        if key and key.strip():
+            expression += f" AND key : ({_fts_query(key)})"
+        sql = "SELECT doc_id, kind, key, text FROM search WHERE search MATCH ?"
+        params = [expression]
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        return self.conn.execute(sql, params).fetchall()
+
+    def documents_with_field(self, field_id, value):
+        """Pages whose title block field equals `value` (case-insensitive)."""
+        return [doc_id for (doc_id,) in self.conn.execute(
+            "SELECT doc_id FROM fields WHERE field_id = ? AND value = ? COLLATE NOCASE ORDER BY doc_id",
+            (field_id, value),
+        )]
+
+    def document_fields(self, doc_id):
+        return self.conn.execute(
+            "SELECT field_id, value, status FROM fields WHERE doc_id = ? ORDER BY field_id", (doc_id,)
+        ).fetchall()
+
+    def counts(self):
+        return {table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("documents", "fields", "cells")}
+
+    def close(self):
+        self.conn.close()
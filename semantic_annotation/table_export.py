@@ -0,0 +1,124 @@
+# table_export.py
+
+import csv
+import os
+from lxml import etree
+
+RDL_NS = "https://posccaesar.org/15926-4/v4/reference-data-item/"
+
+# One record per table cell, in row-major order
+TABLE_COLUMNS = [
+    "document", "page", "table_kind", "table_id", "row", "col", "rowspan", "colspan", "text",
+    "x0", "y0", "x1", "y1", "rdl_label", "rdl_uri", "column_rdl_uri",
+]
+
+# Low-cardinality string columns, stored as dictionary arrays
+DICTIONARY_COLUMNS = ["document", "page", "table_kind", "table_id", "text", "rdl_label", "rdl_uri", "column_rdl_uri"]
+
+
+def _rdl_matches(column):
+    """(label, uri) pairs attached to a cell, in document order."""
+    matches = []
+    for label_elem in column.findall(f"{{{RDL_NS}}}label"):
+        uri_elem = label_elem.getnext()
+        if uri_elem is not None and uri_elem.tag == f"{{{RDL_NS}}}uri":
+            matches.append((label_elem.text, uri_elem.text))
+    return matches
+
+
+def extract_table_records(root):
+    """Cells of every <table> and <revision_table> of an enriched document, as plain tuples.
+
+    Each tuple follows TABLE_COLUMNS without document and page. `rdl_uri` is the match of the
+    cell's own text, `column_rdl_uri` the match of its column header in the first row (which
+    RDLMapper.propagate_labels_from_header appends to every data cell).
+    """
+    tables = [("table", table.get("id"), table) for table in root.iter("table")]
+    tables += [("revision_table", f"rev{i}", table) for i, table in enumerate(root.iter("revision_table"))]
+
+    records = []
+    for table_kind, table_id, table in tables:
+        header_uris = []
+        for row_index, row in enumerate(table.findall("row")):
+            for col_index, column in enumerate(row.findall("column")):
+                text = " ".join(t.text.strip() for t in column.findall("text") if t.text and t.text.strip())
+                matches = _rdl_matches(column)
+                header_uri = header_uris[col_index] if col_index < len(header_uris) else None
+                if row_index > 0 and table_kind == "table" and header_uri is not None and matches:
+                    matches.pop()  # propagated from the header
+                label, uri = matches[0] if matches else (None, None)
+                if row_index == 0:
+                    header_uris.append(uri)
+                x0, y0, x1, y1 = (float(v) for v in column.get("bbox").split(","))
+                records.append((
+                    table_kind, table_id,
+                    int(column.get("row", row_index)), int(column.get("col", col_index)),
+                    int(column.get("rowspan", 1)), int(column.get("colspan", 1)),
+                    text, x0, y0, x1, y1, label, uri, header_uri if row_index > 0 else uri,
+                ))
+    return records
+
+
+class TableExporter:
+    """Collects table cells page by page and writes them as one columnar file.
+
+    `.parquet` and `.arrow` (Arrow IPC) outputs need pyarrow; without it the cells are
+    written as CSV next to the requested path.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = str(output_path)
+        self.columns = {name: [] for name in TABLE_COLUMNS}
+
+    def __len__(self):
+        return len(self.columns["document"])
+
+    def add(self, pdf_name, page, records):
+        for record in records:
+            for name, value in zip(TABLE_COLUMNS, (str(pdf_name), str(page), *record)):
+                self.columns[name].append(value)
+
+    def add_file(self, xml_path, pdf_name, page):
+        root = etree.parse(str(xml_path)).getroot()
+        self.add(pdf_name, page, extract_table_records(root))
+
+    def to_arrow(self):
+        import pyarrow as pa
+
+        arrays = {}
+        for name in TABLE_COLUMNS:
+            array = pa.array(self.columns[name])
+            if name in DICTIONARY_COLUMNS:
+                array = array.cast(pa.string()).dictionary_encode()
+            arrays[name] = array
+        return pa.table(arrays)
+
+    def write(self):
+        """Writes every collected cell atomically; returns the path actually written."""
+        output_path = self.output_path
+        table = None
+        if not output_path.endswith(".csv"):
+            try:
+                table = self.to_arrow()
+            except ImportError:
+                print("⚠️ pyarrow not found. Writing the table export as CSV instead.")
+                output_path = os.path.splitext(output_path)[0] + ".csv"
+
+        tmp_path = f"{output_path}.tmp"
+        if table is None:
+            self._write_csv(tmp_path)
+        elif output_path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            pq.write_table(table, tmp_path, use_dictionary=DICTIONARY_COLUMNS)
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, tmp_path)
+
+        os.replace(tmp_path, output_path)
+        return output_path
+
+    def _write_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(TABLE_COLUMNS)
+            writer.writerows(zip(*(self.columns[name] for name in TABLE_COLUMNS)))
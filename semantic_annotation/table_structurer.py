@@ -1,7 +1,13 @@
 from lxml import etree
+import numpy as np
 from semantic_annotation.bbox_utils import parse_bbox
+from semantic_annotation.geometry_cache import GeometryCache
+from semantic_annotation.grid_assignment import cell_grid
 from collections import defaultdict
 
+ROW_TOLERANCE = 1.0
+COLUMN_TOLERANCE = 1.0
+
 
 def overlaps_margin_lines(rect_bbox_str, bottom_bbox, right_bbox):
     rx0, ry0, rx1, ry1 = parse_bbox(rect_bbox_str)
@@ -15,10 +21,11 @@ def overlaps_margin_lines(rect_bbox_str, bottom_bbox, right_bbox):
 
 
 class TableStructurer:
-    def __init__(self, rect_root, bottom_line_bbox, right_line_bbox):
+    def __init__(self, rect_root, bottom_line_bbox, right_line_bbox, geometry=None):
         self.rect_root = rect_root
         self.bottom_line_bbox = bottom_line_bbox
         self.right_line_bbox = right_line_bbox
+        self.geometry = geometry if geometry is not None else GeometryCache()
 
     def apply(self):
         self.rect_root.tag = "document"
@@ -67,60 +74,59 @@ class TableStructurer:
 
 
     def _structure_rows(self, table_elem, table_id):
-        rows_by_y = defaultdict(list)
-        for cell in table_elem.findall(".//cell"):
-            bbox = parse_bbox(cell.attrib["bbox"])
-            y_top = round(bbox[1], 1)
-            rows_by_y[y_top].append(cell)
-
-        for cell in table_elem.findall(".//cell"):
+        cells = table_elem.findall(".//cell")
+        for cell in cells:
             table_elem.remove(cell)
 
-        sorted_ys = sorted(rows_by_y.keys(), reverse=True)
-        sorted_rows = [(y, rows_by_y[y]) for y in sorted_ys]
+        # Parse every cell bbox once; rows, columns and spans come from the layout-stage grid
+        boxes = self.geometry.bboxes(cells)
+        rows, cols, rowspans, colspans = cell_grid(cells, boxes, ROW_TOLERANCE, COLUMN_TOLERANCE)
+
+        for row_index in np.unique(rows):
+            members = np.flatnonzero(rows == row_index)
+            members = members[np.lexsort((boxes[members, 0], cols[members]))]
 
-        for row_index, (y, cells) in enumerate(sorted_rows):
             row_elem = etree.Element("row", attrib={"id": f"{table_id}_r{row_index}"})
-            row_cells = sorted(cells, key=lambda c: parse_bbox(c.attrib["bbox"])[0])
-            for col_index, cell in enumerate(row_cells):
+            for col_index, i in enumerate(members):
+                cell = cells[i]
                 cell.tag = "column"
                 cell.attrib["id"] = f"{table_id}_r{row_index}_c{col_index}"
+                cell.attrib["row"] = str(row_index)
+                cell.attrib["col"] = str(cols[i])
+                cell.attrib["rowspan"] = str(rowspans[i])
+                cell.attrib["colspan"] = str(colspans[i])
                 row_elem.append(cell)
             table_elem.append(row_elem)
 
-        self._extract_header(table_elem)
+        self._extract_header(table_elem, boxes)
 
-    def _extract_header(self, table_elem):
-        cell_y_mins = [
-            parse_bbox(col.attrib["bbox"])[1]
-            for row in table_elem.findall(".//row")
-            for col in row.findall(".//column")
-        ]
-        if not cell_y_mins:
+    def _extract_header(self, table_elem, cell_boxes):
+        if not len(cell_boxes):
             return
-        min_row_y = min(cell_y_mins)
+        min_row_y = cell_boxes[:, 1].min()
 
         unassigned_texts = table_elem.findall("text")
-        header_candidates = [
-            (parse_bbox(t.attrib["bbox"])[0], t)
-            for t in unassigned_texts
-            if parse_bbox(t.attrib["bbox"])[3] > min_row_y
-        ]
+        header_candidates = []
+        for t in unassigned_texts:
+            bbox = self.geometry.bbox(t)
+            if bbox[3] > min_row_y:
+                header_candidates.append((bbox, t))
 
         if not header_candidates:
             return
 
-        header_candidates.sort(key=lambda x: x[0])
+        header_candidates.sort(key=lambda x: x[0][0])
         header_texts = [t.text.strip() for _, t in header_candidates if t.text]
 
         if not header_texts:
             return
 
         header_str = " ".join(header_texts)
-        min_x = min(parse_bbox(t.attrib["bbox"])[0] for _, t in header_candidates)
-        min_y = min(parse_bbox(t.attrib["bbox"])[1] for _, t in header_candidates)
-        max_x = max(parse_bbox(t.attrib["bbox"])[2] for _, t in header_candidates)
-        max_y = max(parse_bbox(t.attrib["bbox"])[3] for _, t in header_candidates)
+        boxes = [bbox for bbox, _ in header_candidates]
+        min_x = min(b[0] for b in boxes)
+        min_y = min(b[1] for b in boxes)
+        max_x = max(b[2] for b in boxes)
+        max_y = max(b[3] for b in boxes)
 
         header_elem = etree.Element("header", attrib={
             "bbox": f"{min_x},{min_y},{max_x},{max_y}"
@@ -132,7 +138,8 @@ class TableStructurer:
             table_elem.remove(t)
 
 
-def merge_column_texts(root):
+def merge_column_texts(root, geometry=None):
+    geometry = geometry if geometry is not None else GeometryCache()
     for col in root.iter("column"):
         text_nodes = col.findall("text")
         if len(text_nodes) <= 1:
@@ -142,7 +149,7 @@ def merge_column_texts(root):
         merged_text = " ".join(t.text.strip() for t in text_nodes if t.text and t.text.strip())
 
         # Combine bounding boxes
-        bboxes = [parse_bbox(t.attrib["bbox"]) for t in text_nodes]
+        bboxes = [geometry.bbox(t) for t in text_nodes]
         x0 = min(b[0] for b in bboxes)
         y0 = min(b[1] for b in bboxes)
         x1 = max(b[2] for b in bboxes)
@@ -157,8 +164,8 @@ def merge_column_texts(root):
         merged_elem.text = merged_text
         col.append(merged_elem)
 
-def merge_cell_texts_by_y0(root, y_tol=0.5):
-    from collections import defaultdict
+def merge_cell_texts_by_y0(root, y_tol=0.5, geometry=None):
+    geometry = geometry if geometry is not None else GeometryCache()
 
     for cell in root.iter("cell"):
         texts = cell.findall("text")
@@ -167,8 +174,9 @@ def merge_cell_texts_by_y0(root, y_tol=0.5):
 
         groups = defaultdict(list)
         for t in texts:
-            y0 = round(parse_bbox(t.attrib["bbox"])[1] / y_tol) * y_tol
-            groups[y0].append(t)
+            bbox = geometry.bbox(t)
+            y0 = round(bbox[1] / y_tol) * y_tol
+            groups[y0].append((bbox, t))
 
         if len(groups) == len(texts):
             continue  # nothing to merge
@@ -178,8 +186,8 @@ def merge_cell_texts_by_y0(root, y_tol=0.5):
             cell.remove(t)
 
         for group in groups.values():
-            merged_text = " ".join(t.text.strip() for t in group if t.text and t.text.strip())
-            bboxes = [parse_bbox(t.attrib["bbox"]) for t in group]
+            merged_text = " ".join(t.text.strip() for _, t in group if t.text and t.text.strip())
+            bboxes = [bbox for bbox, _ in group]
             x0 = min(b[0] for b in bboxes)
             y0 = min(b[1] for b in bboxes)
             x1 = max(b[2] for b in bboxes)
@@ -202,3 +210,14 @@ def recursively_indent(elem, level=0):
     else:
         if level and (not elem.tail or not elem.tail.strip()):
             elem.tail = indent
+
+
+def strip_blank_text(elem):
+    """Drops indentation-only text and tails, like parsing with remove_blank_text=True."""
+    for el in elem.iter():
+        if not len(el) or (el.text and el.text.strip()):
+            continue
+        el.text = None
+        for child in el:
+            if child.tail is not None and not child.tail.strip():
+                child.tail = None
@@ -1,48 +1,128 @@
 from lxml import etree
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
-from semantic_annotation.bbox_utils import parse_bbox
-import json
+from semantic_annotation.field_matcher import FieldMatcher
+from semantic_annotation.geometry_cache import GeometryCache
+from semantic_annotation.grid_assignment import GRID_ATTRS, cell_grid
+from semantic_annotation.table_structurer import ROW_TOLERANCE, COLUMN_TOLERANCE
+import numpy as np
 import re
 
+# Default revision table area (x0, y0, x1, y1) when the layout stage knows no better
+REVISION_TABLE_BOUNDS = (796.53, 56.70, 1306.77, 255.12)
+
+
+class TitleBlockIndex:
+    """Spatial index over the cells of one title block, shared by the label/value passes.
+
+    Cells keep their document order, which is the tie-breaker every pass relied on when it
+    scanned the full cell list. Coordinates are PDF points (y grows upwards).
+    """
+
+    def __init__(self, cells, geometry):
+        self.cells = cells
+        self.boxes = [geometry.bbox(cell) for cell in cells]
+
+        # Rounded centres, deduplicated like the original centre -> cell map
+        centre_map = {}
+        for cell, (x0, y0, x1, y1) in zip(cells, self.boxes):
+            centre_map[(round((x0 + x1) / 2.0, 1), round((y0 + y1) / 2.0, 1))] = cell
+        self._columns = defaultdict(list)
+        for (cx, cy), cell in centre_map.items():
+            self._columns[cx].append((cy, cell))
+
+        by_centre = sorted(range(len(cells)), key=lambda i: (self.boxes[i][0] + self.boxes[i][2]) / 2)
+        self._centre_xs = [(self.boxes[i][0] + self.boxes[i][2]) / 2 for i in by_centre]
+        self._by_centre = by_centre
+
+        by_left = sorted(range(len(cells)), key=lambda i: self.boxes[i][0])
+        self._left_xs = [self.boxes[i][0] for i in by_left]
+        self._by_left = by_left
+
+    def column_neighbours(self, bbox, min_dy, max_dy):
+        """Cells whose rounded centre shares the x of `bbox` and lies min_dy..max_dy away in y."""
+        x0, y0, x1, y1 = bbox
+        center_x = round((x0 + x1) / 2.0, 1)
+        center_y = round((y0 + y1) / 2.0, 1)
+        return [cell for cy, cell in self._columns.get(center_x, ()) if min_dy <= abs(cy - center_y) <= max_dy]
+
+    def nearest_above(self, bbox, used_cells, max_dx=5, max_gap=50):
+        """Closest unused cell starting above `bbox` within `max_gap`, centred within `max_dx`."""
+        x0_l, y0_l, x1_l, y1_l = bbox
+        cx_l = (x0_l + x1_l) / 2
+
+        lo = bisect_left(self._centre_xs, cx_l - max_dx - 1)
+        hi = bisect_right(self._centre_xs, cx_l + max_dx + 1)
+        best = None
+        for i in self._by_centre[lo:hi]:
+            cell = self.cells[i]
+            if cell in used_cells:
+                continue
+            x0_c, y0_c, x1_c, y1_c = self.boxes[i]
+            cx_c = (x0_c + x1_c) / 2
+            if abs(cx_c - cx_l) < max_dx and y0_c > y1_l and y0_c - y1_l < max_gap:
+                candidate = (y0_c - y1_l, i)
+                if best is None or candidate < best:
+                    best = candidate
+        return self.cells[best[1]] if best else None
+
+    def cells_below(self, min_x, max_x, min_y, used_cells):
+        """Unused cells, in document order, whose left edge is in [min_x, max_x] and top is at or below min_y."""
+        lo = bisect_left(self._left_xs, min_x)
+        hi = bisect_right(self._left_xs, max_x)
+        found = []
+        for i in self._by_left[lo:hi]:
+            x0, y0, x1, y1 = self.boxes[i]
+            if min_x <= x0 <= max_x and y1 <= min_y:
+                found.append(i)
+        found.sort()
+        return [self.cells[i] for i in found if self.cells[i] not in used_cells]
+
 
 class TitleBlockOrganizer:
-    def __init__(self, xml_root):
+    def __init__(self, xml_root, geometry=None):
         self.root = xml_root
+        self.geometry = geometry if geometry is not None else GeometryCache()
 
-    def detect_revision_table(self):
+    def detect_revision_table(self, bounds=None):
+        """Moves the title block cells inside `bounds` (REVISION_TABLE_BOUNDS by default) into a
+        <revision_table>."""
         for titleblock in self.root.findall(".//titleblock"):
             cells = titleblock.findall(".//cell")
             if not cells:
                 continue
 
-            min_x, max_x = 796.53, 1306.77
-            min_y, max_y = 56.70, 255.12
+            min_x, min_y, max_x, max_y = bounds or REVISION_TABLE_BOUNDS
 
             rev_cells = []
             for cell in cells:
-                x0, y0, x1, y1 = parse_bbox(cell.attrib['bbox'])
+                x0, y0, x1, y1 = self.geometry.bbox(cell)
                 if min_x <= x0 and x1 <= max_x and min_y <= y0 and y1 <= max_y:
                     rev_cells.append(cell)
 
             if len(rev_cells) < 4:
                 continue
 
-            rows_by_y = defaultdict(list)
-            for cell in rev_cells:
-                _, y0, _, y1 = parse_bbox(cell.attrib['bbox'])
-                y_center = round((y0 + y1) / 2.0, 1)
-                rows_by_y[y_center].append(cell)
-
-            sorted_ys = sorted(rows_by_y.keys(), reverse=True)
-            sorted_rows = [sorted(rows_by_y[y], key=lambda c: parse_bbox(c.attrib['bbox'])[0]) for y in sorted_ys]
+            # Same grid numbering as <table>, counted from the revision table's own top-left cell
+            boxes = self.geometry.bboxes(rev_cells)
+            rows, cols, rowspans, colspans = cell_grid(rev_cells, boxes, ROW_TOLERANCE, COLUMN_TOLERANCE)
+            rows, cols = rows - rows.min(), cols - cols.min()
+            sorted_rows = []
+            for row in np.unique(rows):
+                members = np.flatnonzero(rows == row)
+                members = members[np.lexsort((boxes[members, 0], cols[members]))]
+                sorted_rows.append(members)
 
             rev_table_bbox = [min_x, min_y, max_x, max_y]
             rev_table = etree.Element("revision_table", bbox=','.join(map(str, rev_table_bbox)))
-            for row_index, row in enumerate(sorted_rows):
+            for row_index, members in enumerate(sorted_rows):
                 row_elem = etree.Element("row", id=f"rev_r{row_index+1}")
-                for col_index, cell in enumerate(row):
+                for col_index, i in enumerate(members):
+                    cell = rev_cells[i]
                     col_elem = etree.Element("column", attrib=cell.attrib)
                     col_elem.set("id", f"rev_r{row_index+1}_c{col_index+1}")
+                    for key, value in zip(GRID_ATTRS, (rows[i], cols[i], rowspans[i], colspans[i])):
+                        col_elem.set(key, str(value))
                     for child in cell:
                         col_elem.append(child)
                     row_elem.append(col_elem)
@@ -54,14 +134,7 @@ class TitleBlockOrganizer:
                 titleblock.remove(cell)
 
     def detect_titleblock_fields(self, json_config_path):
-        with open(json_config_path, 'r') as f:
-            config = json.load(f)
-
-        label_tokens = set()
-        for labels in config.values():
-            for label in labels:
-                for token in label.lower().strip().split():
-                    label_tokens.add(token)
+        matcher = FieldMatcher.from_file(json_config_path)
 
         for titleblock in self.root.findall(".//titleblock"):
             data_fields = etree.Element("document_metadata")
@@ -77,173 +150,114 @@ class TitleBlockOrganizer:
                 lowered = [t.lower() for t in texts]
 
                 if len(texts) == 1:
-                    if any(texts[0].lower() in [v.lower().strip() for v in labels] for labels in config.values()):
+                    if matcher.is_label(texts[0]):
                         continue
 
                 if len(texts) == 2:
-                    if all(any(token in label_tokens for token in text.lower().split()) for text in texts):
+                    if all(any(token in matcher.label_tokens for token in text.split()) for text in lowered):
                         continue
-                    for field_id, label_variants in config.items():
-                        for variant in label_variants:
-                            variant = variant.lower().strip()
-                            if variant in lowered[0]:
-                                field_elem = etree.Element("document_property", id=field_id, bbox=bbox)
-                                field_elem.text = texts[1]
-                                data_fields.append(field_elem)
-                                titleblock.remove(cell)
-                                used_cells.add(cell)
-                                break
-                            elif variant in lowered[1]:
-                                field_elem = etree.Element("document_property", id=field_id, bbox=bbox)
-                                field_elem.text = texts[0]
-                                data_fields.append(field_elem)
-                                titleblock.remove(cell)
-                                used_cells.add(cell)
-                                break
-                        else:
-                            continue
-                        break
+                    hit = matcher.match_pair(lowered)
+                    if hit is not None:
+                        field_id, label_index = hit
+                        field_elem = etree.Element("document_property", id=field_id, bbox=bbox)
+                        field_elem.text = texts[1 - label_index]
+                        data_fields.append(field_elem)
+                        titleblock.remove(cell)
+                        used_cells.add(cell)
                     continue
 
-                flat_line = " ".join(lowered)
-                for field_id, label_variants in config.items():
-                    for variant in label_variants:
-                        variant_tokens = variant.lower().strip().split()
-                        variant_str = " ".join(variant_tokens)
-
-                        matched_indices = []
-                        for win_size in range(1, len(lowered) + 1):
-                            for i in range(len(lowered) - win_size + 1):
-                                if " ".join(lowered[i:i+win_size]) == variant_str:
-                                    matched_indices = list(range(i, i+win_size))
-                                    break
-                            if matched_indices:
-                                break
-
-                        if not matched_indices:
-                            continue
-
-                        label_boxes = [parse_bbox(text_elems[i].attrib['bbox']) for i in matched_indices]
-                        label_x0s = [b[0] for b in label_boxes]
-                        label_y0s = [b[1] for b in label_boxes]
-                        label_y1s = [b[3] for b in label_boxes]
-
-                        label_x0 = min(label_x0s)
-                        label_y_max = max(label_y1s)
+                hit = matcher.match_window(lowered)
+                if hit is None:
+                    continue
+                field_id, matched_indices = hit
 
-                        value_candidates = []
-                        for j, t in enumerate(texts):
-                            if j in matched_indices:
-                                continue
-                            x0, y0, x1, y1 = parse_bbox(text_elems[j].attrib['bbox'])
-                            value_candidates.append((y0, x0, t))
+                label_boxes = [self.geometry.bbox(text_elems[i]) for i in matched_indices]
+                label_x0s = [b[0] for b in label_boxes]
+                label_y0s = [b[1] for b in label_boxes]
+                label_y1s = [b[3] for b in label_boxes]
 
-                        value_candidates.sort()
-                        value = " ".join(v[2] for v in value_candidates).strip()
+                label_x0 = min(label_x0s)
+                label_y_max = max(label_y1s)
 
-                        field_elem = etree.Element("document_property", id=field_id, bbox=bbox)
-                        field_elem.text = value
-                        data_fields.append(field_elem)
-                        titleblock.remove(cell)
-                        used_cells.add(cell)
-                        break
-                    else:
+                value_candidates = []
+                for j, t in enumerate(texts):
+                    if j in matched_indices:
                         continue
-                    break
+                    x0, y0, x1, y1 = self.geometry.bbox(text_elems[j])
+                    value_candidates.append((y0, x0, t))
 
-            self.extract_vertical_label_value_pairs(titleblock, config, data_fields, used_cells)
-            self.extract_horizontal_free_text_fields(titleblock, config, data_fields, used_cells)
-            self.extract_final_missing_fields(titleblock, config, data_fields, used_cells)
+                value_candidates.sort()
+                value = " ".join(v[2] for v in value_candidates).strip()
 
+                field_elem = etree.Element("document_property", id=field_id, bbox=bbox)
+                field_elem.text = value
+                data_fields.append(field_elem)
+                titleblock.remove(cell)
+                used_cells.add(cell)
 
-    def extract_vertical_label_value_pairs(self, titleblock, config, data_fields, used_cells):
-        cells = [cell for cell in titleblock.findall(".//cell") if cell not in used_cells]
-        cell_map = {}
-        for cell in cells:
-            x0, y0, x1, y1 = parse_bbox(cell.attrib['bbox'])
-            center_x = round((x0 + x1) / 2.0, 1)
-            center_y = round((y0 + y1) / 2.0, 1)
-            cell_map[(center_x, center_y)] = cell
+            index = TitleBlockIndex(titleblock.findall(".//cell"), self.geometry)
+            self.extract_vertical_label_value_pairs(titleblock, matcher, data_fields, used_cells, index)
+            self.extract_horizontal_free_text_fields(titleblock, matcher, data_fields, used_cells, index)
+            self.extract_final_missing_fields(titleblock, matcher, data_fields, used_cells, index)
 
+
+    def extract_vertical_label_value_pairs(self, titleblock, matcher, data_fields, used_cells, index):
+        cells = [cell for cell in index.cells if cell not in used_cells]
         for label_cell in cells:
             label_texts = [t.text.strip().lower() for t in label_cell.findall(".//text") if t.text and t.text.strip()]
             if not label_texts:
                 continue
 
             label_flat = " ".join(label_texts)
-            for field_id, variants in config.items():
-                if any(v.lower() in label_flat for v in variants):
-                    x0, y0, x1, y1 = parse_bbox(label_cell.attrib['bbox'])
-                    center_x = round((x0 + x1) / 2.0, 1)
-                    center_y = round((y0 + y1) / 2.0, 1)
-
-                    for (cx, cy), value_cell in cell_map.items():
-                        y_diff = cy - center_y
-                        if cx == center_x and 15.0 <= abs(y_diff) <= 30.0:
-                            value_texts = [t.text.strip() for t in value_cell.findall(".//text") if t.text and t.text.strip()]
-                            if not value_texts:
-                                continue
-
-                            if field_id in ["size", "scale"]:
-                                size_val, scale_val = None, None
-                                for vt in value_texts:
-                                    if not size_val and re.match(r"^[A-Z]\d?$", vt):
-                                        size_val = vt
-                                    elif not scale_val and re.match(r"^\d+\s*:\s*\d+$", vt):
-                                        scale_val = vt
-
-                                if size_val:
-                                    field_elem = etree.Element("document_property", id="size", bbox=value_cell.attrib['bbox'])
-                                    field_elem.text = size_val
-                                    data_fields.append(field_elem)
-                                if scale_val:
-                                    field_elem = etree.Element("document_property", id="scale", bbox=value_cell.attrib['bbox'])
-                                    field_elem.text = scale_val
-                                    data_fields.append(field_elem)
-                            else:
-                                field_elem = etree.Element("document_property", id=field_id, bbox=value_cell.attrib['bbox'])
-                                field_elem.text = " ".join(value_texts)
-                                data_fields.append(field_elem)
-
-                            if value_cell in titleblock:
-                                titleblock.remove(value_cell)
-                            used_cells.add(value_cell)
-
-                    if label_cell in titleblock:
-                        titleblock.remove(label_cell)
-                    used_cells.add(label_cell)
-                    break
-
-    def extract_horizontal_free_text_fields(self, titleblock, config, data_fields, used_cells):
+            field_id = matcher.first_field(label_flat, "lower")
+            if field_id is None:
+                continue
+
+            for value_cell in index.column_neighbours(self.geometry.bbox(label_cell), 15.0, 30.0):
+                value_texts = [t.text.strip() for t in value_cell.findall(".//text") if t.text and t.text.strip()]
+                if not value_texts:
+                    continue
+
+                if field_id in ["size", "scale"]:
+                    size_val, scale_val = None, None
+                    for vt in value_texts:
+                        if not size_val and re.match(r"^[A-Z]\d?$", vt):
+                            size_val = vt
+                        elif not scale_val and re.match(r"^\d+\s*:\s*\d+$", vt):
+                            scale_val = vt
+
+                    if size_val:
+                        field_elem = etree.Element("document_property", id="size", bbox=value_cell.attrib['bbox'])
+                        field_elem.text = size_val
+                        data_fields.append(field_elem)
+                    if scale_val:
+                        field_elem = etree.Element("document_property", id="scale", bbox=value_cell.attrib['bbox'])
+                        field_elem.text = scale_val
+                        data_fields.append(field_elem)
+                else:
+                    field_elem = etree.Element("document_property", id=field_id, bbox=value_cell.attrib['bbox'])
+                    field_elem.text = " ".join(value_texts)
+                    data_fields.append(field_elem)
+
+                if value_cell in titleblock:
+                    titleblock.remove(value_cell)
+                used_cells.add(value_cell)
+
+            if label_cell in titleblock:
+                titleblock.remove(label_cell)
+            used_cells.add(label_cell)
+
+    def extract_horizontal_free_text_fields(self, titleblock, matcher, data_fields, used_cells, index):
         all_texts = [t for t in titleblock.findall(".//text") if t.getparent().tag != "document_property"]
         label_map = {}
         for t in all_texts:
             text_str = t.text.strip().lower() if t.text else ""
-            for field_id, variants in config.items():
-                if any(text_str == v.strip().lower() or text_str.rstrip(':') == v.strip().lower().rstrip(':') for v in variants):
-                    label_map.setdefault(field_id, []).append(t)
+            for field_id in matcher.label_fields(text_str):
+                label_map.setdefault(field_id, []).append(t)
 
         for field_id, label_texts in label_map.items():
             for label in label_texts:
-                x0_l, y0_l, x1_l, y1_l = parse_bbox(label.attrib['bbox'])
-                cx_l = (x0_l + x1_l) / 2
-                cy_l = (y0_l + y1_l) / 2
-
-                best_match = None
-                best_dist = float('inf')
-
-                for cell in titleblock.findall(".//cell"):
-                    if cell in used_cells:
-                        continue
-                    x0_c, y0_c, x1_c, y1_c = parse_bbox(cell.attrib['bbox'])
-                    cx_c = (x0_c + x1_c) / 2
-                    cy_c = (y0_c + y1_c) / 2
-
-                    if abs(cx_c - cx_l) < 5 and y0_c > y1_l and y0_c - y1_l < 50:
-                        dist = y0_c - y1_l
-                        if dist < best_dist:
-                            best_match = cell
-                            best_dist = dist
+                best_match = index.nearest_above(self.geometry.bbox(label), used_cells)
 
                 if best_match is not None:
                     texts = [t.text.strip() for t in best_match.findall(".//text") if t.text and t.text.strip()]
@@ -257,38 +271,33 @@ class TitleBlockOrganizer:
                 if label.getparent() is titleblock:
                     titleblock.remove(label)
 
-    def extract_final_missing_fields(self, titleblock, config, data_fields, used_cells):
+    def extract_final_missing_fields(self, titleblock, matcher, data_fields, used_cells, index):
             label_lines = defaultdict(list)
             for t in titleblock.findall(".//text"):
-                y0 = round(parse_bbox(t.attrib['bbox'])[1], 1)
+                y0 = round(self.geometry.bbox(t)[1], 1)
                 label_lines[y0].append(t)
 
             for y in sorted(label_lines.keys(), reverse=True):
-                line = sorted(label_lines[y], key=lambda t: parse_bbox(t.attrib['bbox'])[0])
+                line = sorted(label_lines[y], key=lambda t: self.geometry.bbox(t)[0])
                 label_text = " ".join(t.text.strip() for t in line if t.text).lower()
-                for field_id, variants in config.items():
-                    for variant in variants:
-                        if variant.lower().strip() in label_text:
-                            label_bbox = [parse_bbox(t.attrib['bbox']) for t in line]
-                            min_x = min(b[0] for b in label_bbox)
-                            max_x = max(b[2] for b in label_bbox)
-                            min_y = min(b[1] for b in label_bbox)
-                            max_y = max(b[3] for b in label_bbox)
-
-                            for cell in titleblock.findall(".//cell"):
-                                if cell in used_cells:
-                                    continue
-                                cx0, cy0, cx1, cy1 = parse_bbox(cell.attrib['bbox'])
-                                if (min_x - 10 <= cx0 <= max_x + 10) and (cy1 <= min_y):
-                                    texts = [t.text.strip() for t in cell.findall(".//text") if t.text and t.text.strip()]
-                                    if not texts:
-                                        continue
-                                    field_elem = etree.Element("document_property", id=field_id)
-                                    field_elem.text = " ".join(texts)
-                                    field_elem.set("bbox", cell.attrib['bbox'])
-                                    data_fields.append(field_elem)
-                                    used_cells.add(cell)
-                                    for t in line:
-                                        if t in titleblock:
-                                            titleblock.remove(t)
-                                    break
\ No newline at end of file
+                for order in sorted(matcher.hits(label_text, "strip")):
+                    field_id = matcher.variant_fields[order]
+                    label_bbox = [self.geometry.bbox(t) for t in line]
+                    min_x = min(b[0] for b in label_bbox)
+                    max_x = max(b[2] for b in label_bbox)
+                    min_y = min(b[1] for b in label_bbox)
+                    max_y = max(b[3] for b in label_bbox)
+
+                    for cell in index.cells_below(min_x - 10, max_x + 10, min_y, used_cells):
+                        texts = [t.text.strip() for t in cell.findall(".//text") if t.text and t.text.strip()]
+                        if not texts:
+                            continue
+                        field_elem = etree.Element("document_property", id=field_id)
+                        field_elem.text = " ".join(texts)
+                        field_elem.set("bbox", cell.attrib['bbox'])
+                        data_fields.append(field_elem)
+                        used_cells.add(cell)
+                        for t in line:
+                            if t in titleblock:
+                                titleblock.remove(t)
+                        break
\ No newline at end of file
@@ -0,0 +1,52 @@
+from lxml import etree
+
+from layout_extraction.rectangle_merger import attach_cell_grids
+from semantic_annotation.grid_assignment import GRID_ATTRS, assign_grid, cell_grid
+from semantic_annotation.table_structurer import TableStructurer
+
+# 3x3 grid (x 0-300, y 0-90) whose top-left cell spans two rows and bottom row spans two columns
+CELLS = [
+    (0, 30, 100, 90), (100, 60, 200, 90), (200, 60, 300, 90),
+    (100, 30, 200, 60), (200, 30, 300, 60),
+    (0, 0, 200, 30), (200, 0, 300, 30),
+]
+
+
+def layout_grid():
+    rects = [{"bbox": (0, 0, 300, 90)}]
+    attach_cell_grids(rects, [{"bbox": b} for b in CELLS])
+    return {c["bbox"]: tuple(c[k] for k in GRID_ATTRS) for c in rects[0]["cells"]}
+
+
+def test_assign_grid_numbers_like_the_layout_stage():
+    expected = layout_grid()
+    rows, cols, rowspans, colspans = assign_grid(CELLS)
+    assigned = {b: (rows[i], cols[i], rowspans[i], colspans[i]) for i, b in enumerate(CELLS)}
+    assert assigned == expected
+    assert expected[(0, 30, 100, 90)] == (0, 0, 2, 1)
+    assert expected[(0, 0, 200, 30)] == (2, 0, 1, 2)
+
+
+def test_carried_grid_attributes_are_kept():
+    cells = [etree.Element("cell", bbox=",".join(map(str, b))) for b in CELLS]
+    cells[0].attrib.update({"row": "5", "col": "6", "rowspan": "2", "colspan": "1"})
+    rows, cols, rowspans, colspans = cell_grid(cells, CELLS)
+    assert (rows[0], cols[0], rowspans[0], colspans[0]) == (5, 6, 2, 1)
+    assert (rows[1], cols[1]) == (0, 1)
+
+
+def test_table_columns_keep_the_layout_grid():
+    expected = layout_grid()
+    root = etree.Element("rectangles")
+    rect = etree.SubElement(root, "rectangle", bbox="0,0,300,90")
+    for b, grid in expected.items():
+        cell = etree.SubElement(rect, "cell", bbox=",".join(map(str, b)))
+        for key, value in zip(GRID_ATTRS, grid):
+            cell.set(key, str(value))
+
+    TableStructurer(root, (0, -50, 10, -40), (-50, 0, -40, 10)).apply()
+    columns = root.findall(".//table/row/column")
+    assert len(columns) == len(CELLS)
+    for column in columns:
+        bbox = tuple(float(v) for v in column.get("bbox").split(","))
+        assert tuple(int(column.get(k)) for k in GRID_ATTRS) == expected[bbox]
@@ -0,0 +1,30 @@
+from layout_extraction.region_proposer import RegionProposer
+
+
+def grid(xs, ys):
+    """Horizontal and vertical rules of a table with column rules at `xs` and row rules at `ys`."""
+    horizontal = [{"bbox": (xs[0], y, xs[-1], y)} for y in ys]
+    vertical = [{"bbox": (x, ys[0], x, ys[-1])} for x in xs]
+    return horizontal, vertical
+
+
+def test_narrow_column_table_is_proposed():
+    horizontal, vertical = grid((100, 150, 200), (100, 120, 140))
+    proposals = RegionProposer().propose(horizontal, vertical, 1000, 1000)
+    assert len(proposals) == 1
+
+
+def test_wide_column_table_is_proposed_whole():
+    # Columns wider than the dilation split the table into one component per vertical rule
+    horizontal, vertical = grid((100, 300, 500), (100, 120, 140))
+    proposals = RegionProposer().propose(horizontal, vertical, 1000, 1000)
+    assert len(proposals) == 1
+    x0, y0, x1, y1 = proposals[0]
+    assert x0 <= 100 and y0 <= 100 and x1 >= 500 and y1 >= 140
+    assert len(RegionProposer.filter_lines(horizontal + vertical, proposals)) == 6
+
+
+def test_isolated_rules_are_not_proposed():
+    horizontal = [{"bbox": (100, 100, 200, 100)}]
+    vertical = [{"bbox": (600, 500, 600, 700)}]
+    assert RegionProposer().propose(horizontal, vertical, 1000, 1000) == []
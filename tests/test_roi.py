@@ -0,0 +1,34 @@
+from lxml import etree
+
+from layout_extraction.roi import prune_page
+
+ROI = (100, 100, 200, 200)
+
+
+def page(xml):
+    return etree.fromstring(f'<page id="1" bbox="0,0,1000,1000">{xml}</page>')
+
+
+def test_primitives_outside_the_roi_are_removed():
+    page_el = page('<line bbox="110,150,190,150"/><line bbox="500,500,600,500"/>'
+                   '<textbox bbox="300,300,400,320"/>')
+    assert prune_page(page_el, ROI) == 2
+    assert [el.get("bbox") for el in page_el] == ["110,150,190,150"]
+
+
+def test_straddling_figure_keeps_only_nested_primitives_inside():
+    page_el = page('<figure bbox="50,50,600,600">'
+                   '<text bbox="120,120,126,130">A</text><text bbox="550,550,556,560">B</text>'
+                   '<figure bbox="400,400,500,500"><curve bbox="410,410,490,490"/></figure>'
+                   '<rect bbox="150,150,450,450"/></figure>')
+    assert prune_page(page_el, ROI) == 2
+    figure = page_el.find("figure")
+    assert [el.tag for el in figure] == ["text", "rect"]
+    assert figure.find("text").text == "A"
+
+
+def test_figures_emptied_or_outside_are_dropped():
+    page_el = page('<figure bbox="50,50,600,600"><line bbox="500,500,600,500"/></figure>'
+                   '<figure bbox="700,700,800,800"><rect bbox="710,710,790,790"/></figure>')
+    assert prune_page(page_el, ROI) == 3
+    assert len(page_el) == 0
@@ -1,20 +1,40 @@
+import csv
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from lxml import etree
+from page_selection import is_selected
 
 VALIDATION_CATEGORIES = ["valid", "empty", "missing"]
+REPORT_BATCH_SIZE = 1024  # Records per Parquet record batch in the corpus report
+
+
+def field_status(value):
+    """Validation category of a field value (None if the field is absent)."""
+    if value is None:
+        return "missing"
+    if value.strip() in ["", "-", " "]:
+        return "empty"
+    return "valid"
 
 class Validator:
-    def __init__(self, xml_path, isofields_path):
+    def __init__(self, xml_path, isofields_path, root=None):
         self.xml_path = xml_path
         self.isofields_path = isofields_path
         self.report = {}
-        self.tree = etree.parse(xml_path)
-        self.root = self.tree.getroot()
+        if root is None:
+            root = etree.parse(xml_path).getroot()
+        self.tree = root.getroottree()
+        self.root = root
         with open(isofields_path, "r") as f:
             self.field_definitions = json.load(f)
 
+    @classmethod
+    def from_root(cls, root, isofields_path, xml_path):
+        """Validates a live document tree; `xml_path` only names where its report is written."""
+        return cls(xml_path, isofields_path, root=root)
+
     def validate_titleblock_fields(self):
         expected_fields = set(self.field_definitions.keys())
         present_fields = {
@@ -23,13 +43,7 @@ class Validator:
         }
 
         for field_id in expected_fields:
-            value = present_fields.get(field_id, None)
-            if value is None:
-                self.report[field_id] = "missing"
-            elif value.strip() in ["", "-", " "]:
-                self.report[field_id] = "empty"
-            else:
-                self.report[field_id] = "valid"
+            self.report[field_id] = field_status(present_fields.get(field_id, None))
 
         return self.report
 
@@ -69,3 +83,150 @@ class Validator:
             json.dump(report_data, f, indent=4)
 
         print(f"\nJSON validation report saved to {json_report_path}")
+
+
+# Field ids of the config, set once per corpus worker process
+_corpus_field_ids = []
+
+
+def _init_corpus_worker(field_ids):
+    _corpus_field_ids[:] = field_ids
+
+
+def read_document_properties(xml_path):
+    """Streams an enriched XML and returns (root attributes, {field id: value}).
+
+    Only document_property elements are kept; everything else is cleared as soon as it has
+    been parsed, so memory stays flat however large the drawing is.
+    """
+    root_attrib = {}
+    properties = {}
+    for event, elem in etree.iterparse(str(xml_path), events=("start", "end")):
+        if event == "start":
+            if not root_attrib and elem.getparent() is None:
+                root_attrib = dict(elem.attrib)
+            continue
+        if elem.tag == "document_property":
+            properties[elem.get("id")] = (elem.text or "").strip()
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+    return root_attrib, properties
+
+
+def _validate_document(xml_path):
+    record = {"path": str(xml_path)}
+    try:
+        root_attrib, properties = read_document_properties(xml_path)
+    except (OSError, etree.XMLSyntaxError) as e:
+        record["error"] = str(e)
+        return record
+
+    number = properties.get("document_number")
+    record["drawing_type"] = root_attrib.get("type")
+    record["drawing_number"] = number if number is not None else "UNKNOWN"
+    for field_id in _corpus_field_ids:
+        record[field_id] = field_status(properties.get(field_id))
+    return record
+
+
+class CorpusValidator:
+    """Validates the title block fields of many enriched XML files in a process pool.
+
+    Writes one aggregated report (.jsonl, .csv or .parquet, by file suffix) and returns
+    per-field completeness statistics.
+    """
+
+    def __init__(self, isofields_path, workers=None, chunksize=32):
+        with open(isofields_path, "r") as f:
+            self.field_ids = sorted(json.load(f).keys())
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+
+    @staticmethod
+    def find_documents(root_dir, pages=None):
+        """Enriched XML files under `root_dir`, limited to `pages` (1-based numbers) if given."""
+        paths = []
+        for dirpath, _, filenames in os.walk(root_dir):
+            paths.extend(os.path.join(dirpath, f) for f in filenames
+                         if f.endswith("_enriched_output.xml") and is_selected(f, pages))
+        return sorted(paths)
+
+    def iter_records(self, paths):
+        if self.workers <= 1:
+            _init_corpus_worker(self.field_ids)
+            yield from map(_validate_document, paths)
+            return
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_corpus_worker,
+                                 initargs=(self.field_ids,)) as pool:
+            yield from pool.map(_validate_document, paths, chunksize=self.chunksize)
+
+    def run(self, paths, report_path):
+        report_path = str(report_path)
+        columns = ["path", "drawing_type", "drawing_number", "error"] + self.field_ids
+        counts = {field_id: dict.fromkeys(VALIDATION_CATEGORIES, 0) for field_id in self.field_ids}
+        stats = {"documents": 0, "errors": 0}
+
+        def tally(records):
+            for record in records:
+                stats["documents"] += 1
+                if "error" in record:
+                    stats["errors"] += 1
+                else:
+                    for field_id in self.field_ids:
+                        counts[field_id][record[field_id]] += 1
+                yield record
+
+        report_path = self._write_report(tally(self.iter_records(paths)), report_path, columns)
+
+        valid_docs = stats["documents"] - stats["errors"]
+        stats["fields"] = {
+            field_id: {**c, "completeness": round(c["valid"] / valid_docs, 4) if valid_docs else 0.0}
+            for field_id, c in counts.items()
+        }
+        stats["report_path"] = report_path
+        with open(os.path.splitext(report_path)[0] + "_stats.json", "w") as f:
+            json.dump(stats, f, indent=4)
+        return stats
+
+    @staticmethod
+    def _write_report(records, report_path, columns):
+        """Streams the records to the report file; returns the path actually written."""
+        if report_path.endswith(".parquet"):
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                print("⚠️ pyarrow not found. Writing the corpus report as CSV instead.")
+                report_path = os.path.splitext(report_path)[0] + ".csv"
+            else:
+                # Written in record batches, so the corpus is never held in memory at once
+                schema = pa.schema([(c, pa.string()) for c in columns])
+                with pq.ParquetWriter(report_path, schema) as writer:
+                    batch = []
+                    for record in records:
+                        batch.append(record)
+                        if len(batch) == REPORT_BATCH_SIZE:
+                            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                            batch = []
+                    if batch:
+                        writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                return report_path
+
+        with open(report_path, "w", newline="") as f:
+            if report_path.endswith(".csv"):
+                writer = csv.DictWriter(f, fieldnames=columns)
+                writer.writeheader()
+                writer.writerows(records)
+            else:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+        return report_path
+
+    @staticmethod
+    def print_stats(stats):
+        print(f"\nCorpus validation: {stats['documents']} documents, {stats['errors']} unreadable")
+        for field_id, c in stats["fields"].items():
+            print(f"- {field_id}: {c['completeness']:.1%} complete "
+                  f"({c['valid']} valid, {c['empty']} empty, {c['missing']} missing)")
+        print(f"Report saved to {stats['report_path']}")